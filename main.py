@@ -1,16 +1,39 @@
 import os
+import sys
 import time
 import feedparser
 import threading
 import requests
+import urllib3
 import re
-import shutil
 import random
-from datetime import datetime
-from flask import Flask, request, jsonify
-from bs4 import BeautifulSoup
+import math
+import io
+import shutil
+import subprocess
+import atexit
+import signal
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
+from flask import Flask, Response, request, jsonify, redirect, send_file, stream_with_context
+from bs4 import BeautifulSoup, SoupStrainer
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
 import xml.etree.ElementTree as ET
 import json
+import tempfile
+from contextlib import contextmanager
+import html
+import unicodedata
+import sqlite3
+import gzip
+import brotli
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from gtts import gTTS
 
 import firebase_admin
@@ -51,128 +74,1281 @@ def get_firestore():
 AUDIO_FOLDER = "static/audio"
 XML_FOLDER = "telegram_xml"
 ARCHIVE_FOLDER = "archive"
-
-TELEGRAM_CHANNELS = {
+DATA_FOLDER = "data"
+MESSAGE_DB = os.path.join(DATA_FOLDER, "messages.db")
+
+FEED_ITEMS = 80
+TELEGRAM_PAGE_SIZE = 20
+TELEGRAM_MAX_PAGES = 5
+# Matched against the raw class attribute while parsing, hence the regex
+TELEGRAM_MESSAGE_STRAINER = SoupStrainer("div", class_=re.compile(r"\btgme_widget_message_wrap\b"))
+TELEGRAM_BG_IMAGE_RE = re.compile(r"background-image:url\(['\"]?([^'\")]+)")
+
+TELEGRAM_REFRESH_SECONDS = int(os.environ.get("TELEGRAM_REFRESH_SECONDS", 600))
+REFRESH_WORKERS = int(os.environ.get("REFRESH_WORKERS", 16))
+REFRESH_JITTER_SECONDS = float(os.environ.get("REFRESH_JITTER_SECONDS", 5))
+MIN_REFRESH_SECONDS = int(os.environ.get("MIN_REFRESH_SECONDS", 60))
+POLL_MIN_SECONDS = int(os.environ.get("POLL_MIN_SECONDS", 120))
+POLL_MAX_SECONDS = int(os.environ.get("POLL_MAX_SECONDS", 3600))
+POLL_HISTORY_DAYS = 14
+POLL_RECENT_HOURS = 3
+POLLS_PER_POST = 2
+# At or above this expected rate a channel counts as active and is never polled less often than today
+POLL_ACTIVE_POSTS_PER_HOUR = 0.1
+AUDIO_REFRESH_SECONDS = int(os.environ.get("AUDIO_REFRESH_SECONDS", 3600))
+AUDIO_TRIGGER_DELAY_SECONDS = float(os.environ.get("AUDIO_TRIGGER_DELAY_SECONDS", 5))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 4))
+SERVE_STALE = os.environ.get("SERVE_STALE", "1") == "1"
+HTTP_HOST_CONCURRENCY = int(os.environ.get("HTTP_HOST_CONCURRENCY", 8))
+
+CHANNELS_CONFIG = os.environ.get("CHANNELS_CONFIG", "channels.json")
+
+DEFAULT_TELEGRAM_CHANNELS = {
     "Pathravarthakal": "https://t.me/s/Pathravarthakal",
     "DailyCa": "https://t.me/s/DailyCAMalayalam",
 }
 
+CHANNEL_LABELS = {
+    "DailyCa": "Daily CA",
+}
+
+def load_telegram_channels():
+    # channels.json is either {"name": "url"} or [{"name": ..., "url": ..., "label": ...}]
+    if not os.path.exists(CHANNELS_CONFIG):
+        return dict(DEFAULT_TELEGRAM_CHANNELS)
+    try:
+        with open(CHANNELS_CONFIG, encoding="utf-8") as f:
+            config = json.load(f)
+        if isinstance(config, list):
+            CHANNEL_LABELS.update({c["name"]: c["label"] for c in config if c.get("label")})
+            config = {c["name"]: c.get("url") or f"https://t.me/s/{c['name']}" for c in config}
+        print("[Config] Loaded", len(config), "channels from", CHANNELS_CONFIG)
+        return config
+    except Exception as e:
+        print("[Config Error]", CHANNELS_CONFIG, e)
+        return dict(DEFAULT_TELEGRAM_CHANNELS)
+
+TELEGRAM_CHANNELS = load_telegram_channels()
+
+def channel_label(name):
+    return CHANNEL_LABELS.get(name, name)
+
 os.makedirs(AUDIO_FOLDER, exist_ok=True)
 os.makedirs(XML_FOLDER, exist_ok=True)
 os.makedirs(ARCHIVE_FOLDER, exist_ok=True)
+os.makedirs(DATA_FOLDER, exist_ok=True)
 
 # ============================================================
-# TELEGRAM FEED
+# ATOMIC FILE WRITES
+# ============================================================
+
+@contextmanager
+def atomic_output(path):
+    # Yields a temp path next to `path`; it replaces `path` in one rename only if the block succeeds
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-", suffix=os.path.splitext(path)[1])
+    os.close(fd)
+    try:
+        yield tmp_path
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def atomic_write_bytes(path, data):
+    with atomic_output(path) as tmp_path:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(65536), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# ============================================================
+# RESPONSE HELPERS
 # ============================================================
 
-def archive_feed(xml_path):
+COMPRESS_MIN_BYTES = 512
+
+def serialize_json(payload):
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return body, hashlib.sha1(body).hexdigest()
+
+def cached_json_response(body, etag, max_age):
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response.make_conditional(request)
+
+def negotiate_encoding():
+    accepted = request.accept_encodings
+    if accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+def compress_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+def precompress(body):
+    return {
+        None: body,
+        "gzip": gzip.compress(body, compresslevel=9),
+        "br": brotli.compress(body, quality=11),
+    }
+
+def precompressed_response(variants, etag, mimetype):
+    encoding = negotiate_encoding()
+    response = Response(variants[encoding], mimetype=mimetype)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+        etag = f"{etag}-{encoding}"
+    response.vary.add("Accept-Encoding")
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def compressed_response(body, mimetype):
+    response = Response(mimetype=mimetype)
+    encoding = negotiate_encoding() if len(body) >= COMPRESS_MIN_BYTES else None
+    response.set_data(compress_body(body, encoding))
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
+# ============================================================
+# UPSTREAM HTTP
+# ============================================================
+
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 20))
+HTTP_VALIDATOR_CACHE_SIZE = 1024
+
+_http_session = requests.Session()
+_http_session.headers["User-Agent"] = "Mozilla/5.0"
+_http_adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+_http_session.mount("https://", _http_adapter)
+_http_session.mount("http://", _http_adapter)
+
+def _counting_pool(base):
+    # Counts every new upstream connection per host; requests minus connections is the reuse
+    class CountingPool(base):
+        def _new_conn(self):
+            host = self.host if self.port in (None, 80, 443) else f"{self.host}:{self.port}"
+            _http_stat(host, connections=1)
+            return super()._new_conn()
+    return CountingPool
+
+_http_adapter.poolmanager.pool_classes_by_scheme = {
+    "http": _counting_pool(urllib3.HTTPConnectionPool),
+    "https": _counting_pool(urllib3.HTTPSConnectionPool),
+}
+
+_http_lock = threading.Lock()
+_http_validators = OrderedDict()
+# Validators of pages handed to a caller but not yet processed; see commit_validator()
+_http_pending_validators = OrderedDict()
+_http_host_slots = {}
+http_host_stats = {}
+
+def _http_stat(host, **amounts):
+    with _http_lock:
+        host_stats = http_host_stats.setdefault(host, {
+            "requests": 0, "connections": 0, "notModified": 0, "unchanged": 0, "errors": 0, "bytes": 0,
+            "totalMs": 0.0,
+        })
+        for key, amount in amounts.items():
+            host_stats[key] += amount
+
+def _http_host_slot(host):
+    with _http_lock:
+        if host not in _http_host_slots:
+            _http_host_slots[host] = threading.BoundedSemaphore(HTTP_HOST_CONCURRENCY)
+        return _http_host_slots[host]
+
+def http_validator_key(url, params=None):
+    return requests.Request("GET", url, params=params).prepare().url
+
+def http_get(url, params=None, timeout=15):
+    # Returns None when the upstream body is unchanged since the last processed fetch of this URL.
+    # The new validators only take effect once the caller has stored the page: commit_validator()
+    full_url = http_validator_key(url, params)
+    host = urlparse(full_url).netloc
+    with _http_lock:
+        cached = _http_validators.get(full_url, {})
+
+    headers = {}
+    if cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+
+    start = time.time()
     try:
-        if not os.path.exists(xml_path):
+        with _http_host_slot(host):
+            r = _http_session.get(full_url, headers=headers, timeout=timeout)
+        if r.status_code != 304:
+            r.raise_for_status()
+    except Exception:
+        _http_stat(host, requests=1, errors=1, totalMs=(time.time() - start) * 1000)
+        raise
+    _http_stat(host, requests=1, bytes=len(r.content), totalMs=(time.time() - start) * 1000)
+
+    if r.status_code == 304:
+        _http_stat(host, notModified=1)
+        return None
+
+    body_hash = hashlib.sha1(r.content).hexdigest()
+    if body_hash == cached.get("hash"):
+        _http_stat(host, unchanged=1)
+        return None
+
+    with _http_lock:
+        _http_pending_validators[full_url] = {
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "hash": body_hash,
+        }
+        _http_pending_validators.move_to_end(full_url)
+        while len(_http_pending_validators) > HTTP_VALIDATOR_CACHE_SIZE:
+            _http_pending_validators.popitem(last=False)
+    return r
+
+def commit_validator(url, params=None):
+    # Called after the page from http_get() was processed; until then a refetch returns the body again
+    full_url = http_validator_key(url, params)
+    with _http_lock:
+        validator = _http_pending_validators.pop(full_url, None)
+        if validator is None:
             return
-        month_folder = datetime.now().strftime("%Y-%m")
-        archive_dir = os.path.join(ARCHIVE_FOLDER, month_folder)
-        os.makedirs(archive_dir, exist_ok=True)
-        archive_path = os.path.join(archive_dir, os.path.basename(xml_path))
-        shutil.copy2(xml_path, archive_path)
-        print("[Feed Archived]", archive_path)
-    except Exception as e:
-        print("[Archive Error]", e)
+        _http_validators[full_url] = validator
+        _http_validators.move_to_end(full_url)
+        while len(_http_validators) > HTTP_VALIDATOR_CACHE_SIZE:
+            _http_validators.popitem(last=False)
+
+def http_stats_snapshot():
+    with _http_lock:
+        snapshot = {host: dict(s) for host, s in http_host_stats.items()}
+    for host, s in snapshot.items():
+        s["reused"] = max(0, s["requests"] - s["errors"] - s["connections"])
+        s["avgMs"] = round(s["totalMs"] / s["requests"], 1) if s["requests"] else 0
+        s["totalMs"] = round(s["totalMs"], 1)
+    return snapshot
 
-def fetch_telegram_xml(name, url):
+# ============================================================
+# MESSAGE STORE
+# ============================================================
+
+_message_db_local = threading.local()
+
+def get_message_db():
+    conn = getattr(_message_db_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(MESSAGE_DB, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        _message_db_local.conn = conn
+    return conn
+
+def init_message_db():
+    with get_message_db() as db:
+        db.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                channel TEXT NOT NULL,
+                msg_id INTEGER NOT NULL,
+                date TEXT,
+                link TEXT,
+                text TEXT,
+                fetched_at REAL,
+                links TEXT,
+                media TEXT,
+                day TEXT,
+                PRIMARY KEY (channel, msg_id)
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        columns = {row["name"] for row in db.execute("PRAGMA table_info(messages)")}
+        for column in ("links", "media", "day"):
+            if column not in columns:
+                db.execute(f"ALTER TABLE messages ADD COLUMN {column} TEXT")
+        db.execute("UPDATE messages SET day = substr(date, 1, 10) WHERE day IS NULL AND date != ''")
+        db.execute("CREATE INDEX IF NOT EXISTS messages_channel_day ON messages (channel, day)")
+        db.execute("CREATE INDEX IF NOT EXISTS messages_day ON messages (day)")
+
+init_message_db()
+
+def message_day(date):
     try:
-        r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=15)
-        r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-        rss_root = ET.Element("rss", version="2.0")
-        channel = ET.SubElement(rss_root, "channel")
-        ET.SubElement(channel, "title").text = f"{name} Telegram Feed"
-
-        for msg in soup.select(".tgme_widget_message_wrap")[:80]:
-            date_tag = msg.select_one("a.tgme_widget_message_date")
-            link = date_tag.get("href", url) if date_tag else url
+        return datetime.fromisoformat(date).astimezone().strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        return datetime.now().strftime("%Y-%m-%d")
+
+def store_messages(channel_name, messages):
+    # Append-only: messages already stored for this channel are never rewritten
+    if not messages:
+        return 0
+    db = get_message_db()
+    with db:
+        # rowcount leaves out the FTS trigger writes that total_changes would include
+        inserted = db.executemany(
+            "INSERT OR IGNORE INTO messages (channel, msg_id, date, link, text, fetched_at, links, media, day) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(channel_name, m["id"], m["date"], m["link"], m["text"], time.time(),
+              json.dumps(m.get("links", [])), json.dumps(m.get("media", [])), message_day(m["date"]))
+             for m in messages],
+        ).rowcount
+    if inserted:
+        invalidate_archive_index()
+    return inserted
+
+def import_legacy_archives():
+    # One-time import of the old archive/<YYYY-MM>/<channel>.xml snapshots
+    db = get_message_db()
+    if db.execute("SELECT 1 FROM meta WHERE key = 'legacy_archives_imported'").fetchone():
+        return
+    imported = 0
+    for month in sorted(os.listdir(ARCHIVE_FOLDER)):
+        month_path = os.path.join(ARCHIVE_FOLDER, month)
+        if not os.path.isdir(month_path):
+            continue
+        for filename in os.listdir(month_path):
+            if not filename.endswith(".xml"):
+                continue
+            messages = []
+            for entry in feedparser.parse(os.path.join(month_path, filename)).entries:
+                id_match = re.search(r"/(\d+)$", entry.get("link", ""))
+                if id_match:
+                    messages.append({"id": int(id_match.group(1)), "date": f"{month}-01",
+                                     "link": entry.get("link", ""), "text": entry.get("description", "")})
+            imported += store_messages(filename[:-4], messages)
+    with db:
+        db.execute("INSERT INTO meta (key, value) VALUES ('legacy_archives_imported', ?)", (str(imported),))
+    print("[Archive Import]", imported, "messages imported from legacy XML archives")
+
+_archive_index_lock = threading.Lock()
+_archive_index = None
+
+def invalidate_archive_index():
+    global _archive_index
+    with _archive_index_lock:
+        _archive_index = None
+
+def archive_index():
+    # [(month, [{"channel", "messages"}, ...]), ...] newest month first, rebuilt only after new inserts
+    global _archive_index
+    with _archive_index_lock:
+        if _archive_index is not None:
+            return _archive_index
+    rows = get_message_db().execute(
+        "SELECT substr(day, 1, 7) AS month, channel, COUNT(*) AS messages FROM messages "
+        "GROUP BY month, channel ORDER BY month DESC, channel"
+    ).fetchall()
+    months = OrderedDict()
+    for row in rows:
+        months.setdefault(row["month"], []).append({"channel": row["channel"], "messages": row["messages"]})
+    index = list(months.items())
+    with _archive_index_lock:
+        _archive_index = index
+    return index
+
+def month_messages(channel_name, month, limit, before=None):
+    sql = "SELECT * FROM messages WHERE channel = ? AND day >= ? AND day < ?"
+    params = [channel_name, f"{month}-01", f"{month}-32"]
+    if before:
+        sql += " AND msg_id < ?"
+        params.append(before)
+    sql += " ORDER BY msg_id DESC LIMIT ?"
+    params.append(limit)
+    return get_message_db().execute(sql, params)
+
+def channel_cursor(channel_name):
+    row = get_message_db().execute(
+        "SELECT MAX(msg_id) AS newest, MIN(msg_id) AS oldest FROM messages WHERE channel = ?",
+        (channel_name,),
+    ).fetchone()
+    return row["newest"], row["oldest"]
+
+def latest_messages(channel_name, limit):
+    rows = get_message_db().execute(
+        "SELECT * FROM messages WHERE channel = ? ORDER BY msg_id DESC LIMIT ?",
+        (channel_name, limit),
+    ).fetchall()
+    return rows[::-1]
+
+# ============================================================
+# PARSED FEED CACHE
+# ============================================================
+
+_feed_cache_lock = threading.Lock()
+_feed_cache = {}
+feed_cache_stats = {"hits": 0, "misses": 0}
+
+def _feed_file_key(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def load_feed_entries(path):
+    key = _feed_file_key(path)
+    if key is None:
+        return []
+    with _feed_cache_lock:
+        cached = _feed_cache.get(path)
+        if cached and cached[0] == key:
+            feed_cache_stats["hits"] += 1
+            return cached[1]
+        feed_cache_stats["misses"] += 1
+
+    entries = list(feedparser.parse(path).entries)
+    with _feed_cache_lock:
+        _feed_cache[path] = (key, entries)
+    return entries
+
+# ============================================================
+# TELEGRAM FEED
+# ============================================================
+
+def parse_telegram_messages(html, url):
+    # One parse of the message nodes only, then one walk per message for every field
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=TELEGRAM_MESSAGE_STRAINER)
+    messages = []
+    for wrap in soup.find_all("div", class_="tgme_widget_message_wrap"):
+        post_id, link, date, text = "", url, "", None
+        links, media = [], []
+        for tag in wrap.descendants:
+            if tag.name is None:
+                continue
+            classes = tag.get("class") or ()
+            if not post_id and tag.has_attr("data-post"):
+                post_id = tag["data-post"]
+            if "tgme_widget_message_date" in classes:
+                link = tag.get("href", url)
+                time_tag = tag.find("time")
+                date = time_tag.get("datetime", "") if time_tag else ""
+            elif text is None and "tgme_widget_message_text" in classes:
+                text = tag.get_text(" ", strip=True)
+                links = [a["href"] for a in tag.find_all("a", href=True)]
+            elif "tgme_widget_message_photo_wrap" in classes or "tgme_widget_message_video_thumb" in classes:
+                image = TELEGRAM_BG_IMAGE_RE.search(tag.get("style", ""))
+                if image:
+                    media.append(image.group(1))
+            elif tag.name == "video" and tag.get("src"):
+                media.append(tag["src"])
+
+        id_match = re.search(r"/(\d+)$", post_id or link)
+        if not id_match:
+            continue
+        messages.append({
+            "id": int(id_match.group(1)),
+            "date": date,
+            "link": link,
+            "text": text or "",
+            "links": links,
+            "media": media,
+        })
+    return messages
+
+def fetch_telegram_page(url, **params):
+    r = http_get(url, params=params or None)
+    if r is None:
+        return []
+    return parse_telegram_messages(r.text, url)
+
+# A t.me/s page (20 posts: photos, video, link previews, forwards, replies) kept in the repo
+# so parser benchmarks are reproducible without network access
+BENCH_PAGE_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench", "tme_s_page.html")
+
+def bench_parse(path=BENCH_PAGE_FIXTURE, rounds=20):
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+
+    def legacy_parse(html):
+        soup = BeautifulSoup(html, "html.parser")
+        texts = []
+        for msg in soup.select(".tgme_widget_message_wrap"):
             text_tag = msg.select_one(".tgme_widget_message_text")
             desc_html = text_tag.decode_contents() if text_tag else ""
-            clean_text = BeautifulSoup(desc_html, "html.parser").get_text(" ", strip=True)
+            texts.append(BeautifulSoup(desc_html, "html.parser").get_text(" ", strip=True))
+        return texts
+
+    for label, parse in (("two-pass html.parser", legacy_parse),
+                         (f"single-pass {HTML_PARSER}", lambda h: parse_telegram_messages(h, ""))):
+        start = time.perf_counter()
+        count = sum(len(parse(html)) for _ in range(rounds))
+        elapsed = time.perf_counter() - start
+        print(f"[Bench] {label}: {count} messages in {elapsed:.2f}s = {count / elapsed:.0f} messages/s")
+
+def write_channel_xml(name):
+    rss_root = ET.Element("rss", version="2.0")
+    channel = ET.SubElement(rss_root, "channel")
+    ET.SubElement(channel, "title").text = f"{name} Telegram Feed"
+
+    for row in latest_messages(name, FEED_ITEMS):
+        item = ET.SubElement(channel, "item")
+        ET.SubElement(item, "title").text = row["text"][:100]
+        ET.SubElement(item, "link").text = row["link"]
+        ET.SubElement(item, "description").text = row["text"]
+
+    xml_path = os.path.join(XML_FOLDER, f"{name}.xml")
+    with atomic_output(xml_path) as tmp_path:
+        ET.ElementTree(rss_root).write(tmp_path, encoding="utf-8", xml_declaration=True)
+    load_feed_entries(xml_path)
+    prerender_channel_page(name)
+    return xml_path
 
-            item = ET.SubElement(channel, "item")
-            ET.SubElement(item, "title").text = clean_text[:100]
-            ET.SubElement(item, "link").text = link
-            ET.SubElement(item, "description").text = clean_text
+def fetch_telegram_xml(name, url):
+    try:
+        newest, _ = channel_cursor(name)
+        changed = 0
+        # Walk forward from the cursor; t.me/s serves about 20 messages per page
+        for _ in range(TELEGRAM_MAX_PAGES):
+            params = {"after": newest} if newest else {}
+            messages = fetch_telegram_page(url, **params)
+            changed += store_messages(name, messages)
+            commit_validator(url, params or None)
+            if not newest or not messages:
+                break
+            page_newest = max(m["id"] for m in messages)
+            if page_newest <= newest:
+                break
+            newest = page_newest
 
         xml_path = os.path.join(XML_FOLDER, f"{name}.xml")
-        ET.ElementTree(rss_root).write(xml_path, encoding="utf-8", xml_declaration=True)
-        archive_feed(xml_path)
-        print("[Feed Updated]", name)
+        if changed or not os.path.exists(xml_path):
+            write_channel_xml(name)
+            print("[Feed Updated]", name, changed, "new")
+        return changed
     except Exception as e:
         print("[Telegram Error]", name, e)
+        return None
+
+def backfill_telegram_channel(name, url, pages=50, workers=4):
+    _, oldest = channel_cursor(name)
+    if not oldest:
+        fetch_telegram_xml(name, url)
+        _, oldest = channel_cursor(name)
+    if not oldest:
+        print("[Backfill] No messages found for", name)
+        return 0
+
+    # A ?before= page holds the newest messages below the cursor, so cursors
+    # spaced one page apart cover the whole range and can be fetched in parallel
+    cursors = [c for c in range(oldest, 0, -TELEGRAM_PAGE_SIZE)][:pages]
+
+    def fetch(before):
+        try:
+            return fetch_telegram_page(url, before=before)
+        except Exception as e:
+            print("[Backfill Error]", name, before, e)
+            return []
+
+    added = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for before, messages in zip(cursors, pool.map(fetch, cursors)):
+            added += store_messages(name, messages)
+            commit_validator(url, {"before": before})
+    write_channel_xml(name)
+    print("[Backfill]", name, added, "messages added from", len(cursors), "pages")
+    return added
+
+_refresh_pool = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="refresh")
+
+_refresh_lock = threading.Lock()
+_refresh_inflight = {}
+_last_refresh = {}
+# Last scrape that actually reached upstream; _last_refresh also counts failures (for throttling)
+_last_refresh_ok = {}
+refresh_stats = {"scrapes": 0, "coalesced": 0, "throttled": 0}
+
+def refresh_channel_once(name, force=False):
+    # Single-flight: concurrent callers for one channel share a single scrape
+    with _refresh_lock:
+        future = _refresh_inflight.get(name)
+        if future:
+            refresh_stats["coalesced"] += 1
+            leader = False
+        elif not force and time.time() - _last_refresh.get(name, 0) < MIN_REFRESH_SECONDS:
+            refresh_stats["throttled"] += 1
+            return None
+        else:
+            future = Future()
+            _refresh_inflight[name] = future
+            refresh_stats["scrapes"] += 1
+            leader = True
+
+    if not leader:
+        return future.result()
 
-def telegram_updater():
-    while True:
-        for name, url in TELEGRAM_CHANNELS.items():
-            fetch_telegram_xml(name, url)
-        time.sleep(600)
+    try:
+        result = fetch_telegram_xml(name, TELEGRAM_CHANNELS[name])
+        if result is not None:
+            with _refresh_lock:
+                _last_refresh_ok[name] = time.time()
+        future.set_result(result)
+        # Audio only needs rebuilding when the scrape actually added messages
+        if result:
+            trigger_job(f"audio:{name}", delay=AUDIO_TRIGGER_DELAY_SECONDS)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _refresh_lock:
+            del _refresh_inflight[name]
+            _last_refresh[name] = time.time()
+
+def revalidate_in_background(name):
+    # Always throttled: request-triggered scrapes must not bypass MIN_REFRESH_SECONDS, even on a
+    # cold start whose first scrape failed; only the scheduler forces a refresh
+    with _refresh_lock:
+        if name in _refresh_inflight or time.time() - _last_refresh.get(name, 0) < MIN_REFRESH_SECONDS:
+            return
+    _refresh_pool.submit(refresh_channel_once, name)
+
+def feed_age_seconds(name):
+    # Age of the content: failed scrapes don't make a feed look fresh
+    with _refresh_lock:
+        checked = _last_refresh_ok.get(name)
+    if checked is None:
+        key = _feed_file_key(os.path.join(XML_FOLDER, f"{name}.xml"))
+        if key is None:
+            return None
+        checked = key[0] / 1e9
+    return max(0, time.time() - checked)
+
+_poll_state = {}
+
+def channel_poll_interval(name, now=None):
+    # Posting rate for this hour of the day (from recent history) or the last few hours, whichever is
+    # busier; active channels are polled a couple of times per expected post but never less often than
+    # TELEGRAM_REFRESH_SECONDS, idle ones back off towards POLL_MAX_SECONDS
+    now = now or time.time()
+    since = datetime.fromtimestamp(now - POLL_HISTORY_DAYS * 86400).strftime("%Y-%m-%d")
+    rows = get_message_db().execute(
+        "SELECT date FROM messages WHERE channel = ? AND day >= ?", (name, since)).fetchall()
+    stamps = []
+    for (date,) in rows:
+        try:
+            if "T" in date:
+                stamps.append(datetime.fromisoformat(date).timestamp())
+        except ValueError:
+            pass
+    stamps = [t for t in stamps if now - POLL_HISTORY_DAYS * 86400 <= t <= now]
+    if not stamps:
+        interval, rate = TELEGRAM_REFRESH_SECONDS, None
+    else:
+        days = min(POLL_HISTORY_DAYS, max(1, (now - min(stamps)) / 86400))
+        hour = datetime.fromtimestamp(now).hour
+        gaps = [abs(datetime.fromtimestamp(t).hour - hour) for t in stamps]
+        near_hour = sum(1 for gap in gaps if min(gap, 24 - gap) <= 1)
+        recent = sum(1 for t in stamps if now - t <= POLL_RECENT_HOURS * 3600)
+        rate = max(near_hour / (3 * days), recent / POLL_RECENT_HOURS)
+        interval = 3600 / rate / POLLS_PER_POST if rate else POLL_MAX_SECONDS
+        # Busy channels only ever speed up; the longer intervals are for idle hours
+        if rate >= POLL_ACTIVE_POSTS_PER_HOUR:
+            interval = min(interval, TELEGRAM_REFRESH_SECONDS)
+    interval = min(POLL_MAX_SECONDS, max(POLL_MIN_SECONDS, interval))
+    _poll_state[name] = {"interval": round(interval), "postsPerHour": round(rate, 3) if rate is not None else None}
+    return interval
+
+def poll_interval_cached(name):
+    return _poll_state.get(name, {}).get("interval", TELEGRAM_REFRESH_SECONDS)
 
 # ============================================================
 # AUDIO
 # ============================================================
 
+BULLETIN_INTRO = "ഇന്നത്തെ പ്രധാന വാർത്തകൾ."
+BULLETIN_EMPTY = "ഇന്ന് വാർത്തകൾ ലഭ്യമല്ല."
+BULLETIN_ITEMS = 25
+TTS_LANG = "ml"
+SEGMENT_FOLDER = os.path.join(AUDIO_FOLDER, "segments")
+SEGMENT_CACHE_MAX_BYTES = int(os.environ.get("SEGMENT_CACHE_MAX_MB", 200)) * 1024 * 1024
+TTS_BACKEND = os.environ.get("TTS_BACKEND", "gtts")
+TTS_WORKERS = int(os.environ.get("TTS_WORKERS", 4))
+TTS_RETRIES = 3
+TTS_BACKOFF_SECONDS = 1.0
+FAKE_TTS_LATENCY = float(os.environ.get("FAKE_TTS_LATENCY", 0.2))
+AUDIO_VERSIONS_KEPT = 2
+
+# gTTS already returns ~32 kbps mono MP3, so the ladder rungs sit below that
+AUDIO_LADDER = {
+    "opus16": {"ext": "opus", "mimetype": "audio/ogg",
+               "args": ["-c:a", "libopus", "-b:a", "16k", "-ac", "1", "-application", "voip"]},
+    "mp3-24": {"ext": "mp3", "mimetype": "audio/mpeg",
+               "args": ["-c:a", "libmp3lame", "-b:a", "24k", "-ac", "1", "-ar", "16000"]},
+}
+
+os.makedirs(SEGMENT_FOLDER, exist_ok=True)
+
+audio_stats = {"regenerated": 0, "skipped": 0, "errors": 0, "segmentHits": 0, "segmentMisses": 0,
+               "segmentShared": 0, "ttsChunks": 0, "ttsRetries": 0, "liveStreams": 0,
+               "transcodes": 0, "variantServes": 0}
+
+def clean_bulletin_item(entry):
+    text = entry.get("description", "")
+    text = re.sub(r"[\U0001F300-\U0001FAFF\U0001F600-\U0001F64F\u2600-\u27BF\uFE0F\u200D]", " ", text)
+    text = re.sub(r"#\w+|http\S+|@\w+", "", text)
+    text = re.sub(r"(join\s*@\w+.*)$", "", text, flags=re.IGNORECASE)
+    text = re.sub(r"[!?:;]+", ". ", text)
+    text = re.sub(r"[\"'(){}\[\]<>]", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    if len(text) < 5:
+        text = entry.get("title", "")
+    return text
+
+def build_bulletin_segments(entries):
+    items = [text + "." for text in map(clean_bulletin_item, entries) if text]
+    if not items:
+        return [BULLETIN_EMPTY]
+    return [BULLETIN_INTRO] + items
+
+# gTTS sends at most 100 characters per request, so plan chunks to that size
+TTS_CHUNK_CHARS = 100
+SENTENCE_END_RE = re.compile(r"(?<=[.।?!])\s+|\n+")
+
+def _pack_units(units, limit):
+    chunks, current = [], ""
+    for unit in units:
+        if current and len(current) + 1 + len(unit) > limit:
+            chunks.append(current)
+            current = unit
+        else:
+            current = f"{current} {unit}" if current else unit
+    if current:
+        chunks.append(current)
+    return chunks
+
+def plan_tts_chunks(text, limit=TTS_CHUNK_CHARS):
+    # Whole sentences are packed together; only sentences longer than a chunk are split, on word boundaries
+    units = []
+    for sentence in SENTENCE_END_RE.split(text):
+        sentence = sentence.strip()
+        if len(sentence) <= limit:
+            units += [sentence] if sentence else []
+            continue
+        words = []
+        for word in sentence.split():
+            words += [word[i:i + limit] for i in range(0, len(word), limit)]
+        units += _pack_units(words, limit)
+    return _pack_units(units, limit)
+
+def gtts_backend(text):
+    buffer = io.BytesIO()
+    gTTS(text, lang=TTS_LANG).write_to_fp(buffer)
+    return buffer.getvalue()
+
+# One silent 128 kbps / 44.1 kHz MPEG-1 Layer III frame (417 bytes)
+SILENT_MP3_FRAME = b"\xff\xfb\x90\x64" + bytes(413)
+
+def fake_backend(text):
+    time.sleep(FAKE_TTS_LATENCY)
+    return SILENT_MP3_FRAME * max(1, len(text) // 4)
+
+TTS_BACKENDS = {"gtts": gtts_backend, "fake": fake_backend}
+
+_tts_pool = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix="tts")
+
+def synthesize_chunk(chunk, backend):
+    for attempt in range(TTS_RETRIES):
+        try:
+            return backend(chunk)
+        except Exception as e:
+            if attempt == TTS_RETRIES - 1:
+                raise
+            audio_stats["ttsRetries"] += 1
+            delay = TTS_BACKOFF_SECONDS * 2 ** attempt + random.uniform(0, TTS_BACKOFF_SECONDS)
+            print("[TTS Retry]", attempt + 1, e)
+            time.sleep(delay)
+
+def submit_tts_chunks(text, backend=None, pool=None):
+    backend = backend or TTS_BACKENDS[TTS_BACKEND]
+    pool = pool or _tts_pool
+    plan = plan_tts_chunks(text)
+    audio_stats["ttsChunks"] += len(plan)
+    return [pool.submit(synthesize_chunk, chunk, backend) for chunk in plan]
+
+def synthesize_texts(texts, backend=None, pool=None):
+    # Chunks of every text are synthesized concurrently, then stitched back in order per text
+    futures = [submit_tts_chunks(text, backend, pool) for text in texts]
+    return [b"".join(future.result() for future in chunk_futures) for chunk_futures in futures]
+
+def segment_path(text):
+    digest = hashlib.sha256(f"{TTS_LANG}\n{text}".encode("utf-8")).hexdigest()[:32]
+    return os.path.join(SEGMENT_FOLDER, f"{digest}.mp3")
+
+_segment_jobs_lock = threading.Lock()
+_segment_jobs = {}
+
+def _finish_segment(path, job):
+    with _segment_jobs_lock:
+        if job["finished"] or not all(future.done() for future in job["futures"]):
+            return
+        job["finished"] = True
+    try:
+        atomic_write_bytes(path, b"".join(future.result() for future in job["futures"]))
+        job["done"].set_result(path)
+    except BaseException as e:
+        job["done"].set_exception(e)
+    finally:
+        with _segment_jobs_lock:
+            if _segment_jobs.get(path) is job:
+                del _segment_jobs[path]
+
+def acquire_segment(text, path):
+    # Single-flight per segment: the audio job and every live listener share one synthesis.
+    # Returns None when the segment is already on disk, else the shared job (release it when done)
+    with _segment_jobs_lock:
+        job = _segment_jobs.get(path)
+        if job:
+            job["refs"] += 1
+            audio_stats["segmentShared"] += 1
+            return job
+        # The file is written before the job leaves the map, so this check cannot miss both
+        if os.path.exists(path):
+            return None
+        job = {"futures": submit_tts_chunks(text), "done": Future(), "refs": 1, "finished": False}
+        _segment_jobs[path] = job
+        audio_stats["segmentMisses"] += 1
+    for future in job["futures"]:
+        future.add_done_callback(lambda _, path=path, job=job: _finish_segment(path, job))
+    return job
+
+def release_segment(path, job):
+    with _segment_jobs_lock:
+        job["refs"] -= 1
+        if job["refs"] > 0 or job["finished"]:
+            return
+        if _segment_jobs.get(path) is job:
+            del _segment_jobs[path]
+    # Nobody is waiting any more: drop chunks that have not started
+    for future in job["futures"]:
+        future.cancel()
+
+def synthesize_segments(texts):
+    paths = [segment_path(text) for text in texts]
+    jobs = {}
+    for text, path in zip(texts, paths):
+        if path in jobs:
+            continue
+        job = acquire_segment(text, path)
+        if job is None:
+            os.utime(path)
+            audio_stats["segmentHits"] += 1
+        else:
+            jobs[path] = job
+
+    try:
+        for job in jobs.values():
+            job["done"].result()
+    finally:
+        for path, job in jobs.items():
+            release_segment(path, job)
+    return paths
+
+def bench_tts(items=25, workers=TTS_WORKERS):
+    sentence = "കേരളത്തിൽ ഇന്ന് കനത്ത മഴയ്ക്ക് സാധ്യതയുണ്ടെന്ന് കാലാവസ്ഥാ വകുപ്പ് അറിയിച്ചു."
+    texts = [f"{i}. " + " ".join([sentence] * 3) for i in range(items)]
+    chunks = sum(len(plan_tts_chunks(text)) for text in texts)
+    for label, pool_size in (("sequential", 1), (f"parallel x{workers}", workers)):
+        with ThreadPoolExecutor(max_workers=pool_size) as pool:
+            start = time.perf_counter()
+            synthesize_texts(texts, backend=fake_backend, pool=pool)
+            elapsed = time.perf_counter() - start
+        print(f"[Bench] {label}: {items} items / {chunks} chunks in {elapsed:.2f}s")
+
+def evict_segments(keep=()):
+    # Size-bounded LRU over the segment folder; synthesize_segments() touches mtime on every hit
+    segments = []
+    for entry in os.scandir(SEGMENT_FOLDER):
+        if entry.name.endswith(".mp3"):
+            st = entry.stat()
+            segments.append((st.st_mtime, st.st_size, entry.path))
+    total = sum(size for _, size, _ in segments)
+    for _, size, path in sorted(segments):
+        if total <= SEGMENT_CACHE_MAX_BYTES:
+            break
+        if path in keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+def concat_mp3(segment_paths, output_path):
+    if shutil.which("ffmpeg"):
+        list_path = f"{output_path}.list"
+        with open(list_path, "w", encoding="utf-8") as f:
+            for path in segment_paths:
+                f.write(f"file '{os.path.abspath(path)}'\n")
+        try:
+            subprocess.run(
+                ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                 "-i", list_path, "-c", "copy", "-f", "mp3", output_path],
+                check=True, timeout=120,
+            )
+        finally:
+            os.remove(list_path)
+    else:
+        # gTTS output is plain MPEG frames, so byte concatenation is still playable
+        with open(output_path, "wb") as out:
+            for path in segment_paths:
+                with open(path, "rb") as f:
+                    shutil.copyfileobj(f, out)
+
+AUDIO_VERSION_RE = re.compile(r"^[0-9a-f]{12}$")
+
+def audio_version_path(channel_name, version):
+    return os.path.join(AUDIO_FOLDER, f"{channel_name}.{version}.mp3")
+
+def publish_audio_version(channel_name, staged_path):
+    version = file_sha256(staged_path)[:12]
+    versioned_path = audio_version_path(channel_name, version)
+    if not os.path.exists(versioned_path):
+        with atomic_output(versioned_path) as tmp_path:
+            shutil.copyfile(staged_path, tmp_path)
+    return version
+
+def prune_audio_versions(channel_name, current_version):
+    # Keep a few previous versions (with their ladder variants) so listeners mid-download are not cut off
+    pattern = re.compile(rf"^{re.escape(channel_name)}\.([0-9a-f]{{12}})(\.[\w-]+)?\.(mp3|opus)$")
+    files = {}
+    for entry in os.scandir(AUDIO_FOLDER):
+        match = pattern.match(entry.name)
+        if match and match.group(1) != current_version:
+            files.setdefault(match.group(1), []).append(entry)
+    versions = sorted(files, key=lambda v: max(e.stat().st_mtime for e in files[v]))
+    for version in versions[:-AUDIO_VERSIONS_KEPT or None]:
+        for entry in files[version]:
+            os.remove(entry.path)
+
+def audio_variant_path(channel_name, version, variant):
+    return os.path.join(AUDIO_FOLDER, f"{channel_name}.{version}.{variant}.{AUDIO_LADDER[variant]['ext']}")
+
+def transcode_ladder(channel_name, version):
+    # Runs once per bulletin version; variants already on disk for this content hash are kept
+    if not shutil.which("ffmpeg"):
+        return
+    source = audio_version_path(channel_name, version)
+    for variant, rung in AUDIO_LADDER.items():
+        target = audio_variant_path(channel_name, version, variant)
+        if os.path.exists(target):
+            continue
+        try:
+            with atomic_output(target) as tmp_path:
+                subprocess.run(
+                    ["ffmpeg", "-y", "-loglevel", "error", "-i", source, "-vn"] + rung["args"] + [tmp_path],
+                    check=True, timeout=300,
+                )
+            audio_stats["transcodes"] += 1
+        except Exception as e:
+            print("[Transcode Error]", channel_name, variant, e)
+
+def audio_variant_url(channel_name, version, variant):
+    return f"/audio/{channel_name}/{version}/{variant}.{AUDIO_LADDER[variant]['ext']}"
+
+def audio_url(channel_name):
+    version = read_audio_meta(channel_name).get("version")
+    if version and os.path.exists(audio_version_path(channel_name, version)):
+        return f"/audio/{channel_name}/{version}.mp3"
+    return f"/audio/{channel_name}/live"
+
+def audio_sources(channel_name, save_data=False):
+    # (url, type) pairs for an <audio> element, Opus first; [] when no version is published yet
+    version = read_audio_meta(channel_name).get("version")
+    if not version or not os.path.exists(audio_version_path(channel_name, version)):
+        return []
+    sources = []
+    if os.path.exists(audio_variant_path(channel_name, version, "opus16")):
+        sources.append((audio_variant_url(channel_name, version, "opus16"), "audio/ogg; codecs=opus"))
+    if save_data and os.path.exists(audio_variant_path(channel_name, version, "mp3-24")):
+        sources.append((audio_variant_url(channel_name, version, "mp3-24"), "audio/mpeg"))
+    else:
+        sources.append((f"/audio/{channel_name}/{version}.mp3", "audio/mpeg"))
+    return sources
+
+def audio_low_data_url(channel_name):
+    version = read_audio_meta(channel_name).get("version")
+    if version and os.path.exists(audio_variant_path(channel_name, version, "mp3-24")):
+        return audio_variant_url(channel_name, version, "mp3-24")
+    return None
+
+def read_audio_meta(channel_name):
+    try:
+        with open(os.path.join(AUDIO_FOLDER, f"{channel_name}.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_audio_meta(channel_name, meta):
+    atomic_write_bytes(os.path.join(AUDIO_FOLDER, f"{channel_name}.json"), json.dumps(meta).encode("utf-8"))
+
 def generate_audio_from_feed(channel_name):
     path = os.path.join(XML_FOLDER, f"{channel_name}.xml")
     if not os.path.exists(path):
-        fetch_telegram_xml(channel_name, TELEGRAM_CHANNELS[channel_name])
+        if SERVE_STALE:
+            revalidate_in_background(channel_name)
+            print("[Audio Skipped] No feed yet for", channel_name)
+            return
+        refresh_channel_once(channel_name)
 
-    feed = feedparser.parse(path)
-    entries = list(feed.entries)[-25:]
-    full_text = "ഇന്നത്തെ പ്രധാന വാർത്തകൾ.\n\n"
+    segments = build_bulletin_segments(load_feed_entries(path)[-BULLETIN_ITEMS:])
+    text_hash = hashlib.sha256("\n\n".join(segments).encode("utf-8")).hexdigest()
+    output_path = os.path.join(AUDIO_FOLDER, f"{channel_name}.mp3")
 
-    for entry in entries:
-        text = entry.get("description", "")
-        text = re.sub(r"[\U0001F300-\U0001FAFF\U0001F600-\U0001F64F\u2600-\u27BF\uFE0F\u200D]", " ", text)
-        text = re.sub(r"#\w+|http\S+|@\w+", "", text)
-        text = re.sub(r"(join\s*@\w+.*)$", "", text, flags=re.IGNORECASE)
-        text = re.sub(r"[!?:;]+", ". ", text)
-        text = re.sub(r"[\"'(){}\[\]<>]", " ", text)
-        text = re.sub(r"\s+", " ", text).strip()
-        if len(text) < 5:
-            text = entry.get("title", "")
-        if text:
-            full_text += text + ".\n\n"
-
-    if len(full_text.strip()) < 10:
-        full_text = "ഇന്ന് വാർത്തകൾ ലഭ്യമല്ല."
+    # Same bulletin text as the last synthesis: nothing to do
+    if os.path.exists(output_path) and read_audio_meta(channel_name).get("textHash") == text_hash:
+        audio_stats["skipped"] += 1
+        return
 
     try:
-        output_path = os.path.join(AUDIO_FOLDER, f"{channel_name}.mp3")
-        gTTS(full_text, lang="ml").save(output_path)
+        # Only items without a cached segment go to the TTS service
+        segment_paths = synthesize_segments(segments)
+        with atomic_output(output_path) as staged_path:
+            concat_mp3(segment_paths, staged_path)
+            version = publish_audio_version(channel_name, staged_path)
+        if segments[0] == BULLETIN_INTRO:
+            append_hls_items(channel_name, segments[1:])
+        evict_segments(keep=set(segment_paths) | hls_segment_paths())
+        transcode_ladder(channel_name, version)
+        write_audio_meta(channel_name, {"textHash": text_hash, "version": version, "generatedAt": time.time()})
+        prune_audio_versions(channel_name, version)
+        audio_stats["regenerated"] += 1
         print("[Audio Updated]", channel_name)
     except Exception as e:
+        audio_stats["errors"] += 1
         print("[TTS Error]", e)
 
-def audio_updater():
-    while True:
-        for name in TELEGRAM_CHANNELS:
-            generate_audio_from_feed(name)
-        time.sleep(600)
+@app.route("/audio/<channel_name>/<version>.mp3")
+def audio_version(channel_name, version):
+    if channel_name not in TELEGRAM_CHANNELS or not AUDIO_VERSION_RE.match(version):
+        return "Audio not found", 404
+    path = audio_version_path(channel_name, version)
+    if not os.path.exists(path):
+        return redirect(audio_url(channel_name))
+
+    response = send_file(os.path.abspath(path), mimetype="audio/mpeg", conditional=True, max_age=31536000)
+    response.cache_control.immutable = True
+    return response
+
+@app.route("/audio/<channel_name>/<version>/<variant>.<ext>")
+def audio_variant(channel_name, version, variant, ext):
+    # Every ladder rung has its own immutable URL, so caches never have to vary on request headers
+    if (channel_name not in TELEGRAM_CHANNELS or not AUDIO_VERSION_RE.match(version)
+            or variant not in AUDIO_LADDER or ext != AUDIO_LADDER[variant]["ext"]):
+        return "Audio not found", 404
+    path = audio_variant_path(channel_name, version, variant)
+    if not os.path.exists(path):
+        if os.path.exists(audio_version_path(channel_name, version)):
+            return redirect(f"/audio/{channel_name}/{version}.mp3")
+        return redirect(audio_url(channel_name))
+
+    audio_stats["variantServes"] += 1
+    response = send_file(os.path.abspath(path), mimetype=AUDIO_LADDER[variant]["mimetype"],
+                         conditional=True, max_age=31536000)
+    response.cache_control.immutable = True
+    return response
+
+LIVE_READ_BYTES = 16384
+
+def stream_bulletin(segments):
+    # Missing segments are all queued for synthesis up front (shared with other listeners and
+    # the audio job), then every segment is yielded in order, chunk by chunk for new ones
+    plans = []
+    for text in segments:
+        path = segment_path(text)
+        plans.append([text, path, acquire_segment(text, path)])
+
+    try:
+        for plan in plans:
+            text, path, job = plan
+            while job is None:
+                try:
+                    with open(path, "rb") as f:
+                        for block in iter(lambda: f.read(LIVE_READ_BYTES), b""):
+                            yield block
+                    break
+                except FileNotFoundError:
+                    plan[2] = job = acquire_segment(text, path)
+            if job is None:
+                continue
+            for future in job["futures"]:
+                yield future.result()
+    finally:
+        for _, path, job in plans:
+            if job is not None:
+                release_segment(path, job)
+
+@app.route("/audio/<channel_name>/live")
+def audio_live(channel_name):
+    if channel_name not in TELEGRAM_CHANNELS:
+        return "Invalid channel", 404
+    path = os.path.join(XML_FOLDER, f"{channel_name}.xml")
+    if not os.path.exists(path):
+        revalidate_in_background(channel_name)
+        return "Bulletin not ready yet", 503, {"Retry-After": "10"}
+
+    audio_stats["liveStreams"] += 1
+    segments = build_bulletin_segments(load_feed_entries(path)[-BULLETIN_ITEMS:])
+    response = Response(stream_with_context(stream_bulletin(segments)), mimetype="audio/mpeg")
+    response.cache_control.no_store = True
+    return response
 
 # ============================================================
-# TELEGRAM PAGES
+# HLS
 # ============================================================
 
-@app.route("/telegram/<channel_name>")
-def telegram_html(channel_name):
+HLS_FOLDER = os.path.join(AUDIO_FOLDER, "hls")
+HLS_WINDOW_ITEMS = int(os.environ.get("HLS_WINDOW_ITEMS", 100))
+
+os.makedirs(HLS_FOLDER, exist_ok=True)
+
+MPEG1_L3_KBPS = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+MPEG2_L3_KBPS = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+MPEG_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+def mp3_duration(data):
+    # Sums frame durations from the MPEG Layer III frame headers; avoids an ffprobe dependency
+    pos = 0
+    if data[:3] == b"ID3":
+        pos = 10 + ((data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9])
+    duration = 0.0
+    while pos + 4 <= len(data):
+        b1, b2 = data[pos + 1], data[pos + 2]
+        version, layer = (b1 >> 3) & 3, (b1 >> 1) & 3
+        bitrate_idx, rate_idx, padding = b2 >> 4, (b2 >> 2) & 3, (b2 >> 1) & 1
+        if (data[pos] != 0xFF or (b1 & 0xE0) != 0xE0 or layer != 1 or version == 1
+                or bitrate_idx in (0, 15) or rate_idx == 3):
+            pos += 1
+            continue
+        mpeg1 = version == 3
+        bitrate = (MPEG1_L3_KBPS if mpeg1 else MPEG2_L3_KBPS)[bitrate_idx] * 1000
+        sample_rate = MPEG_SAMPLE_RATES[version][rate_idx]
+        duration += (1152 if mpeg1 else 576) / sample_rate
+        pos += (144 if mpeg1 else 72) * bitrate // sample_rate + padding
+    return duration
+
+def _syncsafe(n):
+    return bytes([(n >> 21) & 0x7F, (n >> 14) & 0x7F, (n >> 7) & 0x7F, n & 0x7F])
+
+def id3_timestamp_tag(seconds):
+    # HLS packed audio segments carry their start time in an ID3 PRIV frame (90 kHz clock)
+    payload = b"com.apple.streaming.transportStreamTimestamp\x00" + (int(seconds * 90000) & 0x1FFFFFFFF).to_bytes(8, "big")
+    frame = b"PRIV" + _syncsafe(len(payload)) + b"\x00\x00" + payload
+    return b"ID3\x04\x00\x00" + _syncsafe(len(frame)) + frame
+
+def read_hls_state(channel_name):
+    try:
+        with open(os.path.join(HLS_FOLDER, f"{channel_name}.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"mediaSequence": 0, "entries": []}
+
+def append_hls_items(channel_name, item_texts):
+    # Append-only: items already in the playlist keep their sequence number; the window slides from the head
+    state = read_hls_state(channel_name)
+    entries = state["entries"]
+    known = {entry["segment"] for entry in entries}
+    appended = 0
+    for text in item_texts:
+        path = segment_path(text)
+        segment = os.path.basename(path)[:-4]
+        if segment in known or not os.path.exists(path):
+            continue
+        with open(path, "rb") as f:
+            duration = mp3_duration(f.read())
+        start = entries[-1]["start"] + entries[-1]["duration"] if entries else 0.0
+        entries.append({
+            "seq": state["mediaSequence"] + len(entries),
+            "segment": segment,
+            "duration": round(duration, 3),
+            "start": round(start, 3),
+            "title": text[:80],
+        })
+        known.add(segment)
+        appended += 1
+
+    while len(entries) > HLS_WINDOW_ITEMS:
+        entries.pop(0)
+        state["mediaSequence"] += 1
+    if appended:
+        atomic_write_bytes(os.path.join(HLS_FOLDER, f"{channel_name}.json"),
+                           json.dumps(state, ensure_ascii=False).encode("utf-8"))
+    return appended
+
+def hls_segment_paths():
+    paths = set()
+    for entry in os.scandir(HLS_FOLDER):
+        if entry.name.endswith(".json"):
+            for item in read_hls_state(entry.name[:-5])["entries"]:
+                paths.add(os.path.join(SEGMENT_FOLDER, f"{item['segment']}.mp3"))
+    return paths
+
+@app.route("/audio/<channel_name>/hls.m3u8")
+def hls_playlist(channel_name):
     if channel_name not in TELEGRAM_CHANNELS:
         return "Invalid channel", 404
+    state = read_hls_state(channel_name)
+    entries = state["entries"]
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        f"#EXT-X-TARGETDURATION:{math.ceil(max([e['duration'] for e in entries] or [1]))}",
+        f"#EXT-X-MEDIA-SEQUENCE:{state['mediaSequence']}",
+    ]
+    for entry in entries:
+        title = entry["title"].replace(",", " ").replace("\n", " ")
+        lines.append(f"#EXTINF:{entry['duration']:.3f},{title}")
+        lines.append(f"/audio/{channel_name}/hls/{entry['seq']}-{entry['segment'][:12]}.mp3")
+    response = Response("\n".join(lines) + "\n", mimetype="application/vnd.apple.mpegurl")
+    response.cache_control.max_age = 5
+    return response
+
+@app.route("/audio/<channel_name>/hls/<int:seq>-<segment>.mp3")
+def hls_segment(channel_name, seq, segment):
+    if channel_name not in TELEGRAM_CHANNELS:
+        return "Invalid channel", 404
+    entry = next((e for e in read_hls_state(channel_name)["entries"]
+                  if e["seq"] == seq and e["segment"].startswith(segment)), None)
+    path = os.path.join(SEGMENT_FOLDER, f"{entry['segment']}.mp3") if entry else None
+    if not path or not os.path.exists(path):
+        return "Segment not found", 404
+    with open(path, "rb") as f:
+        body = id3_timestamp_tag(entry["start"]) + f.read()
+    response = Response(body, mimetype="audio/mpeg")
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response
 
-    path = os.path.join(XML_FOLDER, f"{channel_name}.xml")
-    if request.args.get("refresh") == "1":
-        fetch_telegram_xml(channel_name, TELEGRAM_CHANNELS[channel_name])
-    if not os.path.exists(path):
-        fetch_telegram_xml(channel_name, TELEGRAM_CHANNELS[channel_name])
+# ============================================================
+# TELEGRAM PAGES
+# ============================================================
+
+_rendered_pages_lock = threading.Lock()
+_rendered_pages = {}
 
-    feed = feedparser.parse(path)
-    posts = ""
-    for entry in list(feed.entries)[::-1][:50]:
-        posts += f"<div class='post-card'><p>{entry.get('description','')}</p></div>"
+def render_channel_page(channel_name, entries):
+    posts = "".join(
+        f"<div class='post-card'><p>{entry.get('description','')}</p></div>"
+        for entry in entries[::-1][:50]
+    )
 
     return f"""
 <!DOCTYPE html>
@@ -193,47 +1369,262 @@ body{{font-family:system-ui;background:#f5f7fb;margin:0;padding:16px}}
 </html>
 """
 
+def prerender_channel_page(channel_name):
+    path = os.path.join(XML_FOLDER, f"{channel_name}.xml")
+    key = _feed_file_key(path)
+    body = render_channel_page(channel_name, load_feed_entries(path)).encode("utf-8")
+    page = {
+        "key": key,
+        "etag": hashlib.sha1(body).hexdigest(),
+        "variants": precompress(body),
+    }
+    with _rendered_pages_lock:
+        _rendered_pages[channel_name] = page
+    return page
+
+def get_rendered_page(channel_name):
+    path = os.path.join(XML_FOLDER, f"{channel_name}.xml")
+    with _rendered_pages_lock:
+        page = _rendered_pages.get(channel_name)
+    if page and page["key"] == _feed_file_key(path):
+        return page
+    return prerender_channel_page(channel_name)
+
+PLACEHOLDER_PAGE = """
+<!DOCTYPE html>
+<html>
+<head>
+<meta name="viewport" content="width=device-width,initial-scale=1">
+<meta http-equiv="refresh" content="5">
+</head>
+<body style="font-family:system-ui;background:#f5f7fb;padding:16px">
+<h2>{channel_name}</h2>
+<p>Fetching the latest posts&hellip; this page will reload in a few seconds.</p>
+</body>
+</html>
+"""
+
+@app.route("/telegram/<channel_name>")
+def telegram_html(channel_name):
+    if channel_name not in TELEGRAM_CHANNELS:
+        return "Invalid channel", 404
+
+    path = os.path.join(XML_FOLDER, f"{channel_name}.xml")
+    if SERVE_STALE:
+        # Stale-while-revalidate: never wait on upstream inside a request
+        if not os.path.exists(path):
+            revalidate_in_background(channel_name)
+            response = Response(PLACEHOLDER_PAGE.format(channel_name=channel_name), mimetype="text/html")
+            response.cache_control.no_store = True
+            return response
+        age = feed_age_seconds(channel_name)
+        if request.args.get("refresh") == "1":
+            revalidate_in_background(channel_name)
+        elif age is not None and age > 2 * poll_interval_cached(channel_name):
+            revalidate_in_background(channel_name)
+    else:
+        if not os.path.exists(path):
+            refresh_channel_once(channel_name)
+        elif request.args.get("refresh") == "1":
+            refresh_channel_once(channel_name)
+        age = feed_age_seconds(channel_name)
+
+    page = get_rendered_page(channel_name)
+    response = precompressed_response(page["variants"], page["etag"], "text/html")
+    if age is not None:
+        response.headers["X-Feed-Age"] = str(int(age))
+    return response
+
 # ============================================================
 # ARCHIVES
 # ============================================================
 
+ARCHIVE_MONTHS_PER_PAGE = 12
+ARCHIVE_POSTS_PER_PAGE = 100
+
 @app.route("/archives")
 def archives():
-    months = sorted(os.listdir(ARCHIVE_FOLDER), reverse=True) if os.path.exists(ARCHIVE_FOLDER) else []
-    html = """<!DOCTYPE html><html><head><meta name="viewport" content="width=device-width,initial-scale=1">
+    before = request.args.get("before")
+    index = [(month, channels) for month, channels in archive_index() if not before or month < before]
+    page, more = index[:ARCHIVE_MONTHS_PER_PAGE], len(index) > ARCHIVE_MONTHS_PER_PAGE
+
+    def generate():
+        yield """<!DOCTYPE html><html><head><meta name="viewport" content="width=device-width,initial-scale=1">
     <style>body{font-family:system-ui;padding:16px;background:#f5f7fb}.card{background:white;padding:16px;border-radius:16px;margin-bottom:16px;box-shadow:0 4px 12px rgba(0,0,0,.05)}.file{display:block;padding:10px;margin-top:8px;background:#e3f2fd;border-radius:10px;text-decoration:none;color:#1565c0;font-weight:500}</style></head><body><h2>📦 Feed Archives</h2>"""
-    if not months:
-        html += "<p>No archives found.</p>"
-    for month in months:
-        month_path = os.path.join(ARCHIVE_FOLDER, month)
-        if not os.path.isdir(month_path):
-            continue
-        html += f"<div class='card'><h3>{month}</h3>"
-        for filename in os.listdir(month_path):
-            html += f"<a class='file' href='/archive/{month}/{filename}'>{filename}</a>"
-        html += "</div>"
-    html += "</body></html>"
-    return html
+        if not page:
+            yield "<p>No archives found.</p>"
+        for month, channels in page:
+            yield f"<div class='card'><h3>{month}</h3>" + "".join(
+                f"<a class='file' href='/archive/{month}/{c['channel']}.xml'>{c['channel']}.xml ({c['messages']})</a>"
+                for c in channels
+            ) + "</div>"
+        if more:
+            yield f"<a class='file' href='/archives?before={page[-1][0]}'>Older months →</a>"
+        yield "</body></html>"
+
+    return Response(stream_with_context(generate()), mimetype="text/html")
 
 @app.route("/archive/<month>/<filename>")
 def archive_file(month, filename):
-    archive_path = os.path.join(ARCHIVE_FOLDER, month, filename)
-    if not os.path.exists(archive_path):
+    channel_name = filename[:-4] if filename.endswith(".xml") else filename
+    before = request.args.get("before", type=int)
+    rows = month_messages(channel_name, month, ARCHIVE_POSTS_PER_PAGE + 1, before)
+    first = rows.fetchone()
+    if first is None:
         return "Archive not found", 404
-    feed = feedparser.parse(archive_path)
-    posts = ""
-    for entry in list(feed.entries)[::-1][:100]:
-        posts += f"<div class='post'><h3>{entry.get('title','')}</h3><p>{entry.get('description','')}</p><a href='{entry.get('link','#')}' target='_blank'>Open Source</a></div>"
+
+    def generate():
+        yield """<!DOCTYPE html><html><head><meta name="viewport" content="width=device-width,initial-scale=1">
+    <style>body{font-family:system-ui;padding:16px;background:#f5f7fb}.post{background:white;padding:16px;border-radius:16px;margin-bottom:16px;box-shadow:0 4px 12px rgba(0,0,0,.05)}</style></head><body><h2>📦 Archive Feed</h2>"""
+        last_id, count, row = None, 0, first
+        while row is not None:
+            count += 1
+            if count > ARCHIVE_POSTS_PER_PAGE:
+                yield f"<a href='?before={last_id}'>Older posts →</a>"
+                break
+            last_id = row["msg_id"]
+            yield f"<div class='post'><h3>{html.escape(row['text'][:100])}</h3><p>{html.escape(row['text'])}</p><a href='{html.escape(row['link'] or '#')}' target='_blank'>Open Source</a></div>"
+            row = rows.fetchone()
+        yield "</body></html>"
+
+    return Response(stream_with_context(generate()), mimetype="text/html")
+
+# ============================================================
+# SEARCH
+# ============================================================
+
+# unicode61 treats Malayalam vowel signs and virama as separators, which
+# shreds words into fragments; keeping them as token characters fixes that
+MALAYALAM_TOKENCHARS = "".join(
+    chr(c) for c in range(0x0D00, 0x0D80) if unicodedata.category(chr(c)) in ("Mn", "Mc")
+) + "\u200c\u200d"
+SEARCH_TERM_RE = re.compile(r"[\w\u0d00-\u0d7f\u200c\u200d]+")
+
+def init_search_index():
+    db = get_message_db()
+    exists = db.execute("SELECT 1 FROM sqlite_master WHERE name = 'messages_fts'").fetchone()
+    with db:
+        db.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                text, content='messages', content_rowid='rowid',
+                tokenize="unicode61 remove_diacritics 2 tokenchars '{MALAYALAM_TOKENCHARS}'"
+            )
+        """)
+        db.executescript("""
+            CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+                INSERT INTO messages_fts (rowid, text) VALUES (new.rowid, new.text);
+            END;
+            CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+                INSERT INTO messages_fts (messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+            END;
+        """)
+        if not exists:
+            db.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+
+init_search_index()
+
+def fts_query(query):
+    # Prefix-match every term so inflected Malayalam forms (വാർത്ത -> വാർത്തകൾ) match
+    return " ".join(f'"{term}"*' for term in SEARCH_TERM_RE.findall(query))
+
+def search_messages(query, channel=None, since=None, until=None, limit=50):
+    match = fts_query(query)
+    if not match:
+        return []
+    sql = ("SELECT m.channel, m.msg_id, m.date, m.day, m.link, "
+           "snippet(messages_fts, 0, '\x02', '\x03', ' … ', 24) AS snippet "
+           "FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid "
+           "WHERE messages_fts MATCH ?")
+    params = [match]
+    if channel:
+        sql += " AND m.channel = ?"
+        params.append(channel)
+    if since:
+        sql += " AND m.day >= ?"
+        params.append(since)
+    if until:
+        sql += " AND m.day <= ?"
+        params.append(until)
+    sql += " ORDER BY rank LIMIT ?"
+    params.append(limit)
+    return get_message_db().execute(sql, params).fetchall()
+
+def search_args():
+    return {
+        "query": request.args.get("q", "").strip(),
+        "channel": request.args.get("channel") or None,
+        "since": request.args.get("from") or None,
+        "until": request.args.get("to") or None,
+        "limit": max(1, min(request.args.get("limit", 50, type=int), 200)),
+    }
+
+@app.route("/api/search")
+def search_api():
+    args = search_args()
+    start = time.time()
+    try:
+        rows = search_messages(args["query"], args["channel"], args["since"], args["until"], args["limit"])
+    except sqlite3.OperationalError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "query": args["query"],
+        "tookMs": round((time.time() - start) * 1000, 1),
+        "results": [{
+            "channel": row["channel"],
+            "msgId": row["msg_id"],
+            "date": row["date"],
+            "day": row["day"],
+            "link": row["link"],
+            "snippet": row["snippet"].replace("\x02", "").replace("\x03", ""),
+        } for row in rows],
+    })
+
+@app.route("/search")
+def search_page():
+    args = search_args()
+    rows = []
+    if args["query"]:
+        try:
+            rows = search_messages(args["query"], args["channel"], args["since"], args["until"], args["limit"])
+        except sqlite3.OperationalError:
+            rows = []
+
+    options = "".join(
+        f"<option value='{name}'{' selected' if name == args['channel'] else ''}>{name}</option>"
+        for name in TELEGRAM_CHANNELS
+    )
+    results = ""
+    for row in rows:
+        snippet = html.escape(row["snippet"]).replace("\x02", "<mark>").replace("\x03", "</mark>")
+        results += f"<div class='post'><small>{row['channel']} · {row['day'] or ''}</small><p>{snippet}</p><a href='{html.escape(row['link'] or '#')}' target='_blank'>Open Source</a></div>"
+    if args["query"] and not rows:
+        results = "<p>No results.</p>"
+
     return f"""<!DOCTYPE html><html><head><meta name="viewport" content="width=device-width,initial-scale=1">
-    <style>body{{font-family:system-ui;padding:16px;background:#f5f7fb}}.post{{background:white;padding:16px;border-radius:16px;margin-bottom:16px;box-shadow:0 4px 12px rgba(0,0,0,.05)}}</style></head><body><h2>📦 Archive Feed</h2>{posts}</body></html>"""
+    <style>body{{font-family:system-ui;padding:16px;background:#f5f7fb}}form{{display:flex;flex-wrap:wrap;gap:8px;margin-bottom:16px}}input,select,button{{padding:10px;border-radius:10px;border:1px solid #ccc;font:inherit}}.post{{background:white;padding:16px;border-radius:16px;margin-bottom:16px;box-shadow:0 4px 12px rgba(0,0,0,.05)}}mark{{background:#ffe082}}</style></head><body><h2>🔎 Search News</h2>
+    <form action="/search"><input name="q" value="{html.escape(args['query'])}" placeholder="Search…" style="flex:1;min-width:200px">
+    <select name="channel"><option value="">All channels</option>{options}</select>
+    <input type="date" name="from" value="{html.escape(args['since'] or '')}"><input type="date" name="to" value="{html.escape(args['until'] or '')}">
+    <button>Search</button></form>{results}</body></html>"""
 
 # ============================================================
 # HOME
 # ============================================================
 
+def audio_button(channel_name, save_data=False):
+    sources = audio_sources(channel_name, save_data)
+    if not sources:
+        return f'<a class="btn audio" href="{audio_url(channel_name)}"><div class="icon">🎙️</div>{channel_label(channel_name)}</a>'
+    # The browser plays the first source it supports: Opus where available, MP3 otherwise
+    source_tags = "".join(f'<source src="{url}" type="{mimetype}">' for url, mimetype in sources)
+    low_data = audio_low_data_url(channel_name)
+    low_data_link = f'<a class="lowdata" href="{low_data}">⚡ Low data</a>' if low_data else ""
+    return (f'<div class="btn audio"><a href="{sources[-1][0]}"><div class="icon">🎙️</div>{channel_label(channel_name)}</a>'
+            f'<audio controls preload="none">{source_tags}</audio>{low_data_link}</div>')
+
 @app.route("/")
 def home():
-    return """
+    html = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -247,6 +1638,9 @@ h1{color:white;font-size:28px;margin-bottom:20px}
 .btn:active{transform:scale(.97)}
 .icon{font-size:28px;margin-bottom:6px}
 .audio{color:#1565c0}
+.audio a{color:inherit;text-decoration:none}
+.audio audio{width:100%;margin-top:10px}
+.lowdata{font-size:12px;font-weight:400;margin-top:6px}
 .feed{color:#2e7d32}
 .archive{color:#ef6c00}
 </style>
@@ -255,20 +1649,32 @@ h1{color:white;font-size:28px;margin-bottom:20px}
 <h1>📰 വാർത്തകൾ</h1>
 <div class="section">🎧 AUDIO</div>
 <div class="grid">
-<a class="btn audio" href="/static/audio/Pathravarthakal.mp3"><div class="icon">🎙️</div>Pathravarthakal</a>
-<a class="btn audio" href="/static/audio/DailyCa.mp3"><div class="icon">🎙️</div>Daily CA</a>
+__AUDIO_BUTTONS__
 </div>
 <div class="section">📰 NEWS FEEDS</div>
 <div class="grid">
-<a class="btn feed" href="/telegram/Pathravarthakal"><div class="icon">📰</div>Pathravarthakal</a>
-<a class="btn feed" href="/telegram/DailyCa"><div class="icon">📰</div>Daily CA</a>
+__FEED_BUTTONS__
 </div>
 <div class="section">📦 ARCHIVES</div>
+<div class="grid">
 <a class="btn archive" href="/archives"><div class="icon">📦</div>Feed Archives</a>
+<a class="btn archive" href="/search"><div class="icon">🔎</div>Search News</a>
+</div>
 </body>
 </html>
 """
 
+    save_data = request.headers.get("Save-Data", "").lower() == "on"
+    audio_buttons = "\n".join(audio_button(name, save_data) for name in TELEGRAM_CHANNELS)
+    feed_buttons = "\n".join(
+        f'<a class="btn feed" href="/telegram/{name}"><div class="icon">📰</div>{channel_label(name)}</a>'
+        for name in TELEGRAM_CHANNELS
+    )
+    html = html.replace("__AUDIO_BUTTONS__", audio_buttons).replace("__FEED_BUTTONS__", feed_buttons)
+    response = Response(html, mimetype="text/html")
+    response.cache_control.no_cache = True
+    return response
+
 # ============================================================
 # QUIZ ROUTES & APP
 # ============================================================
@@ -875,7 +2281,7 @@ function esc(value){
 }
 
 async function apiGet(url){
-  const response = await fetch(url,{headers:{Accept:"application/json"}});
+  const response = await fetch(url,{headers:{Accept:"application/json"},cache:"no-cache"});
   let data;
   try{data=await response.json();}
   catch(e){throw new Error("Server returned invalid JSON.");}
@@ -931,20 +2337,21 @@ function updateUserUI(user){
 async function showApp(){
   $("loginPage").classList.add("hidden");
   $("appPage").classList.remove("hidden");
-  loadVisitorCount();
   
   try{
-    allTests = await apiGet("/quiz/api/tests");
-    if(!Array.isArray(allTests)) throw new Error("Invalid test data.");
-    
     // Check if the URL path contains a specific test ID (e.g. /quiz/test/some_id)
     const pathSegments = window.location.pathname.split('/');
     const directTestId = pathSegments[pathSegments.length - 2] === 'test' ? decodeURIComponent(pathSegments[pathSegments.length - 1]) : null;
+
+    const boot = await loadBootstrap(directTestId);
+    renderVisitorCount(boot.visitors);
+    allTests = boot.tests;
+    if(!Array.isArray(allTests)) throw new Error("Invalid test data.");
     
     if(directTestId){
       const targetTest = allTests.find(t => t.id === directTestId);
       if(targetTest){
-        startQuiz(targetTest);
+        startQuiz(targetTest, boot.questions);
         return;
       }
     }
@@ -1132,7 +2539,7 @@ function switchTab(tabKey){
   }
 }
 
-async function startQuiz(test){
+async function startQuiz(test, preloadedQuestions){
   selectedTest=test;
   hidePages();
   $("quizPage").classList.remove("hidden");
@@ -1141,7 +2548,7 @@ async function startQuiz(test){
   $("options").innerHTML="";
 
   try{
-    currentQuestions=await apiGet("/quiz/api/questions/"+encodeURIComponent(test.id));
+    currentQuestions=preloadedQuestions||await apiGet("/quiz/api/questions/"+encodeURIComponent(test.id));
     if(!Array.isArray(currentQuestions)||!currentQuestions.length)
       throw new Error("No questions found.");
 
@@ -1378,23 +2785,26 @@ function renderReview(){
   });
 }
 
-async function loadVisitorCount(){
-  try{
-    const key="ca_blockbuster_visited_"+new Date().toISOString().slice(0,10);
+async function loadBootstrap(testId){
+  const key="ca_blockbuster_visited_"+new Date().toISOString().slice(0,10);
+  const firstVisit=!localStorage.getItem(key);
+  const url="/quiz/api/bootstrap"+(testId?"?testId="+encodeURIComponent(testId):"");
 
-    if(!localStorage.getItem(key)){
-      const response=await fetch("/quiz/api/visit",{
-        method:"POST",
-        headers:{"Accept":"application/json"}
-      });
-      if(response.ok)localStorage.setItem(key,"1");
-    }
+  const response=await fetch(url,{
+    method:firstVisit?"POST":"GET",
+    headers:{"Accept":"application/json"}
+  });
+  let data;
+  try{data=await response.json();}
+  catch(e){throw new Error("Server returned invalid JSON.");}
+  if(!response.ok) throw new Error(data.error || "Server error: "+response.status);
+  if(firstVisit&&data.visitors)localStorage.setItem(key,"1");
+  return data;
+}
 
-    const data=await apiGet("/quiz/api/visitors");
-    $("visitorCount").innerHTML="👥 Today: <b>"+Number(data.count||0)+"</b> visitors";
-  }catch(error){
-    console.error("[Visitor Counter]",error);
-  }
+function renderVisitorCount(visitors){
+  if(!visitors)return;
+  $("visitorCount").innerHTML="👥 Today: <b>"+Number(visitors.count||0)+"</b> visitors";
 }
 
 $("infoModalBtn").addEventListener("click",()=>{
@@ -1447,39 +2857,102 @@ if(localStorage.getItem("ca_theme")==="dark"){
     return html
 
 # ============================================================
-# DAILY VISITOR COUNTER
+# DAILY VISITOR COUNTER (write-behind)
 # ============================================================
 
+VISITOR_FLUSH_SECONDS = int(os.environ.get("VISITOR_FLUSH_SECONDS", 10))
+VISITOR_REFRESH_SECONDS = int(os.environ.get("VISITOR_REFRESH_SECONDS", 60))
+
+_visitor_lock = threading.Lock()
+_visitor_pending = {}
+# Visits being written to Firestore, and visits written but not yet seen in a read-back;
+# both still count towards the total so it never dips while a flush is running
+_visitor_inflight = {}
+_visitor_written = {}
+_visitor_flushed = {}
+
+def _visitor_add(bucket, date, amount):
+    bucket[date] = bucket.get(date, 0) + amount
+    if not bucket[date]:
+        del bucket[date]
+
+def _visitor_doc(date):
+    return get_firestore().collection("daily_visitors").document(date)
+
+def _read_visitor_count(date):
+    # Writes acknowledged before this read starts are included in what it returns
+    with _visitor_lock:
+        settled = _visitor_written.get(date, 0)
+    doc = _visitor_doc(date).get()
+    count = 0
+    if doc.exists:
+        data = doc.to_dict() or {}
+        count = int(data.get("count", 0) or 0)
+    with _visitor_lock:
+        _visitor_flushed[date] = (count, time.time())
+        _visitor_add(_visitor_written, date, -settled)
+    return count
+
+def get_visitor_count(date):
+    with _visitor_lock:
+        flushed = _visitor_flushed.get(date)
+    if not flushed or time.time() - flushed[1] > VISITOR_REFRESH_SECONDS:
+        _read_visitor_count(date)
+    with _visitor_lock:
+        return (_visitor_flushed[date][0] + _visitor_written.get(date, 0)
+                + _visitor_inflight.get(date, 0) + _visitor_pending.get(date, 0))
+
+def record_visit():
+    today = datetime.now().strftime("%Y-%m-%d")
+    with _visitor_lock:
+        _visitor_pending[today] = _visitor_pending.get(today, 0) + 1
+    return get_visitor_count(today)
+
+def flush_visitor_counts():
+    with _visitor_lock:
+        pending = dict(_visitor_pending)
+        _visitor_pending.clear()
+        for date, increment in pending.items():
+            _visitor_add(_visitor_inflight, date, increment)
+
+    for date, increment in pending.items():
+        try:
+            _visitor_doc(date).set({
+                "date": date,
+                "count": firestore.Increment(increment),
+                "updatedAt": firestore.SERVER_TIMESTAMP
+            }, merge=True)
+        except Exception as e:
+            print("[Visitor Flush Error]", date, e)
+            with _visitor_lock:
+                _visitor_add(_visitor_inflight, date, -increment)
+                _visitor_add(_visitor_pending, date, increment)
+            continue
+        with _visitor_lock:
+            _visitor_add(_visitor_inflight, date, -increment)
+            _visitor_add(_visitor_written, date, increment)
+        try:
+            # Read back so the total also includes other instances' visits; if this fails the
+            # increment stays in _visitor_written (counted, never re-sent) until a read succeeds
+            _read_visitor_count(date)
+        except Exception as e:
+            print("[Visitor Read Error]", date, e)
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    with _visitor_lock:
+        for date in [d for d in _visitor_flushed if d != today and d not in _visitor_pending
+                     and d not in _visitor_written]:
+            del _visitor_flushed[date]
+
+def visitor_flusher():
+    while True:
+        time.sleep(VISITOR_FLUSH_SECONDS)
+        flush_visitor_counts()
+
 @app.route("/quiz/api/visit", methods=["POST"])
 def quiz_visit():
     try:
-        db = get_firestore()
-
-        today = datetime.now().strftime("%Y-%m-%d")
-        doc_ref = db.collection("daily_visitors").document(today)
-        transaction = db.transaction()
-
-        @firestore.transactional
-        def update_visitor_count(transaction, doc_ref):
-            snapshot = doc_ref.get(transaction=transaction)
-            if snapshot.exists:
-                data = snapshot.to_dict() or {}
-                count = int(data.get("count", 0) or 0) + 1
-                transaction.update(doc_ref, {
-                    "count": count,
-                    "updatedAt": firestore.SERVER_TIMESTAMP
-                })
-            else:
-                count = 1
-                transaction.set(doc_ref, {
-                    "date": today,
-                    "count": count,
-                    "createdAt": firestore.SERVER_TIMESTAMP,
-                    "updatedAt": firestore.SERVER_TIMESTAMP
-                })
-            return count
-
-        count = update_visitor_count(transaction, doc_ref)
+        count = record_visit()
         return jsonify({"success": True, "count": count})
 
     except Exception as e:
@@ -1490,72 +2963,371 @@ def quiz_visit():
 @app.route("/quiz/api/visitors")
 def quiz_visitors():
     try:
-        db = get_firestore()
         today = datetime.now().strftime("%Y-%m-%d")
-        doc = db.collection("daily_visitors").document(today).get()
-
-        count = 0
-        if doc.exists:
-            data = doc.to_dict() or {}
-            count = int(data.get("count", 0) or 0)
-
-        return jsonify({"date": today, "count": count})
+        return jsonify({"date": today, "count": get_visitor_count(today)})
 
     except Exception as e:
         print("[Visitor Count Error]", e)
         return jsonify({"error": str(e)}), 500
 
 
+# ============================================================
+# QUIZ CATALOG (in-memory mirror of custom_tests / custom_questions)
+# ============================================================
+
+QUIZ_CATALOG_MAX_AGE = int(os.environ.get("QUIZ_CATALOG_MAX_AGE", 900))
+QUIZ_CATALOG_POLL_SECONDS = int(os.environ.get("QUIZ_CATALOG_POLL_SECONDS", 300))
+QUIZ_PAYLOAD_CACHE_SIZE = int(os.environ.get("QUIZ_PAYLOAD_CACHE_SIZE", 256))
+QUIZ_CACHE_MAX_AGE = int(os.environ.get("QUIZ_CACHE_MAX_AGE", 60))
+# Quiz titles are dated in India time (Asia/Kolkata has no DST, so a fixed offset avoids needing tzdata)
+QUIZ_TIMEZONE = timezone(timedelta(hours=5, minutes=30))
+QUIZ_FUTURE_DATE_DAYS = 183
+
+_quiz_lock = threading.Lock()
+_quiz_tests = {}
+_quiz_questions = {}
+_quiz_questions_by_test = {}
+_quiz_catalog_ready = threading.Event()
+_quiz_catalog_synced_at = 0
+_quiz_watches = []
+_quiz_payload_cache = OrderedDict()
+# Bumped on every invalidation so a payload built from an older catalog is never cached
+_quiz_payload_generations = {}
+_quiz_payload_epoch = 0
+
+quiz_catalog_stats = {
+    "hits": 0,
+    "misses": 0,
+    "stale": 0,
+    "snapshots": 0,
+    "fullLoads": 0,
+    "payloadHits": 0,
+    "payloadMisses": 0,
+    "notModified": 0,
+}
+
+def _quiz_stat(key, amount=1):
+    with _quiz_lock:
+        quiz_catalog_stats[key] += amount
+
+def parse_test_date_millis(doc_id, title):
+    # AUTOMATICALLY EXTRACT DATE FROM TITLE OR ID when the test has no stored dateMillis
+    combined_str = f"{doc_id} {title}"
+    match = re.search(r'(20\d{2})?[^\w]?([a-zA-Z]{3,9})\s+(\d{1,2})', combined_str)
+    if match:
+        try:
+            year_str, month_str, day_str = match.groups()
+            today = datetime.now(QUIZ_TIMEZONE).date()
+            year = int(year_str) if year_str else today.year
+            date_obj = datetime.strptime(f"{year} {month_str[:3]} {day_str}", "%Y %b %d")
+            # No year in the title: only a date far ahead belongs to last year (Dec 30 seen in January);
+            # today's or tomorrow's test published early keeps the current year
+            if not year_str and (date_obj.date() - today).days > QUIZ_FUTURE_DATE_DAYS:
+                date_obj = date_obj.replace(year=year - 1)
+            return int(date_obj.timestamp() * 1000)
+        except:
+            pass
+    return 0
+
+def quiz_test_from_doc(doc_id, data):
+    title = data.get("title") or ""
+    return {
+        "id": data.get("id") or doc_id,
+        "topicId": data.get("topicId") or "",
+        "title": title,
+        "subtitle": data.get("subtitle") or "",
+        "durationMinutes": data.get("durationMinutes") or 0,
+        "difficulty": data.get("difficulty") or "",
+        "dateMillis": data.get("dateMillis") or parse_test_date_millis(doc_id, title),
+        "questionCount": data.get("questionCount") or 0,
+    }
+
+def quiz_question_from_doc(doc_id, data):
+    return {
+        "id": data.get("id") or doc_id,
+        "testId": data.get("testId") or "",
+        "topicId": data.get("topicId") or "",
+        "questionText": data.get("questionText") or "",
+        "option0": data.get("option0") or "",
+        "option1": data.get("option1") or "",
+        "option2": data.get("option2") or "",
+        "option3": data.get("option3") or "",
+        "correctOptionIndex": data.get("correctOptionIndex", 0),
+        "explanation": data.get("explanation") or "",
+        "hint": data.get("hint") or "",
+    }
+
+def _quiz_invalidate_payload(test_id):
+    _quiz_payload_cache.pop(test_id, None)
+    _quiz_payload_generations[test_id] = _quiz_payload_generations.get(test_id, 0) + 1
+
+def _quiz_invalidate_all_payloads():
+    global _quiz_payload_epoch
+    _quiz_payload_cache.clear()
+    _quiz_payload_epoch += 1
+
+def _quiz_payload_generation(test_id):
+    return _quiz_payload_epoch, _quiz_payload_generations.get(test_id, 0)
+
+def _quiz_put_question(doc_id, question):
+    _quiz_drop_question(doc_id)
+    _quiz_questions[doc_id] = question
+    _quiz_invalidate_payload(None)
+    _quiz_invalidate_payload(question["testId"])
+    if question["testId"]:
+        _quiz_questions_by_test.setdefault(question["testId"], {})[doc_id] = question
+
+def _quiz_drop_question(doc_id):
+    old = _quiz_questions.pop(doc_id, None)
+    if old:
+        _quiz_invalidate_payload(None)
+        _quiz_invalidate_payload(old["testId"])
+    if old and old["testId"] in _quiz_questions_by_test:
+        bucket = _quiz_questions_by_test[old["testId"]]
+        bucket.pop(doc_id, None)
+        if not bucket:
+            del _quiz_questions_by_test[old["testId"]]
+
+def _quiz_mark_synced():
+    global _quiz_catalog_synced_at
+    _quiz_catalog_synced_at = time.time()
+
+def load_quiz_catalog():
+    db = get_firestore()
+    tests = {doc.id: quiz_test_from_doc(doc.id, doc.to_dict() or {})
+             for doc in db.collection("custom_tests").stream()}
+    questions = {doc.id: quiz_question_from_doc(doc.id, doc.to_dict() or {})
+                 for doc in db.collection("custom_questions").stream()}
+    with _quiz_lock:
+        _quiz_tests.clear()
+        _quiz_tests.update(tests)
+        _quiz_questions.clear()
+        _quiz_questions_by_test.clear()
+        _quiz_invalidate_all_payloads()
+        for doc_id, question in questions.items():
+            _quiz_put_question(doc_id, question)
+        quiz_catalog_stats["fullLoads"] += 1
+        _quiz_mark_synced()
+    _quiz_catalog_ready.set()
+    print("[Quiz Catalog Loaded]", len(tests), "tests,", len(questions), "questions")
+
+def _on_quiz_tests_snapshot(col_snapshot, changes, read_time):
+    with _quiz_lock:
+        for change in changes:
+            doc = change.document
+            if change.type.name == "REMOVED":
+                _quiz_tests.pop(doc.id, None)
+            else:
+                _quiz_tests[doc.id] = quiz_test_from_doc(doc.id, doc.to_dict() or {})
+        _quiz_invalidate_payload(None)
+        quiz_catalog_stats["snapshots"] += 1
+        _quiz_mark_synced()
+
+def _on_quiz_questions_snapshot(col_snapshot, changes, read_time):
+    with _quiz_lock:
+        for change in changes:
+            doc = change.document
+            if change.type.name == "REMOVED":
+                _quiz_drop_question(doc.id)
+            else:
+                _quiz_put_question(doc.id, quiz_question_from_doc(doc.id, doc.to_dict() or {}))
+        quiz_catalog_stats["snapshots"] += 1
+        _quiz_mark_synced()
+    try:
+        sync_quiz_test_stats()
+    except Exception as e:
+        print("[Quiz Stats Sync Error]", e)
+
+def _quiz_watches_active():
+    return bool(_quiz_watches) and all(getattr(w, "is_active", True) for w in _quiz_watches)
+
+def quiz_catalog_fresh():
+    if not _quiz_catalog_ready.is_set():
+        return False
+    if _quiz_watches_active():
+        return True
+    return time.time() - _quiz_catalog_synced_at <= QUIZ_CATALOG_MAX_AGE
+
+def quiz_catalog_updater():
+    try:
+        load_quiz_catalog()
+        db = get_firestore()
+        _quiz_watches.append(db.collection("custom_tests").on_snapshot(_on_quiz_tests_snapshot))
+        _quiz_watches.append(db.collection("custom_questions").on_snapshot(_on_quiz_questions_snapshot))
+        print("[Quiz Catalog] Snapshot listeners attached")
+    except Exception as e:
+        print("[Quiz Catalog Error]", e)
+
+    # Fallback poll: only reloads when the listeners have died or never attached
+    while True:
+        time.sleep(QUIZ_CATALOG_POLL_SECONDS)
+        if _quiz_watches_active():
+            continue
+        try:
+            load_quiz_catalog()
+        except Exception as e:
+            print("[Quiz Catalog Error]", e)
+
+def get_quiz_tests():
+    if quiz_catalog_fresh():
+        with _quiz_lock:
+            quiz_catalog_stats["hits"] += 1
+            tests = [dict(test, questionCount=len(_quiz_questions_by_test.get(test["id"], {})))
+                     for test in _quiz_tests.values()]
+    else:
+        if _quiz_catalog_ready.is_set():
+            _quiz_stat("stale")
+        _quiz_stat("misses")
+        tests = fetch_quiz_tests_from_firestore()
+
+    # STRICT LOGICAL SORTING: Automatically sort latest dates on top
+    tests.sort(key=lambda t: t.get("dateMillis", 0), reverse=True)
+    return tests
+
+def get_quiz_questions(test_id):
+    if quiz_catalog_fresh():
+        with _quiz_lock:
+            quiz_catalog_stats["hits"] += 1
+            return list(_quiz_questions_by_test.get(test_id, {}).values())
+    if _quiz_catalog_ready.is_set():
+        _quiz_stat("stale")
+    _quiz_stat("misses")
+    return fetch_quiz_questions_from_firestore(test_id)
+
+def get_quiz_payload(test_id=None):
+    # test_id=None is the tests listing; anything else is that test's questions
+    if quiz_catalog_fresh():
+        with _quiz_lock:
+            cached = _quiz_payload_cache.get(test_id)
+            if cached:
+                _quiz_payload_cache.move_to_end(test_id)
+                quiz_catalog_stats["payloadHits"] += 1
+                quiz_catalog_stats["hits"] += 1
+                return cached
+
+    with _quiz_lock:
+        generation = _quiz_payload_generation(test_id)
+    payload = get_quiz_tests() if test_id is None else get_quiz_questions(test_id)
+    body, etag = serialize_json(payload)
+    _quiz_stat("payloadMisses")
+    if quiz_catalog_fresh():
+        with _quiz_lock:
+            # A snapshot landed while this body was built: serve it once, but don't cache it
+            if _quiz_payload_generation(test_id) != generation:
+                return body, etag
+            _quiz_payload_cache[test_id] = (body, etag)
+            while len(_quiz_payload_cache) > QUIZ_PAYLOAD_CACHE_SIZE:
+                _quiz_payload_cache.popitem(last=False)
+    return body, etag
+
 # ============================================================
 # QUIZ FIRESTORE API
 # ============================================================
 
+QUIZ_TEST_FIELDS = ["id", "topicId", "title", "subtitle", "durationMinutes", "difficulty", "dateMillis", "questionCount"]
+
+def count_quiz_questions(test_id):
+    db = get_firestore()
+    result = db.collection("custom_questions").where("testId", "==", test_id).count().get()
+    return int(result[0][0].value)
+
+def fetch_quiz_tests_from_firestore():
+    db = get_firestore()
+    tests = []
+    for doc in db.collection("custom_tests").select(QUIZ_TEST_FIELDS).stream():
+        data = doc.to_dict() or {}
+        test = quiz_test_from_doc(doc.id, data)
+        # Tests written before the questionCount backfill are counted server-side
+        if "questionCount" not in data:
+            test["questionCount"] = count_quiz_questions(test["id"])
+        tests.append(test)
+    return tests
+
+def sync_quiz_test_stats():
+    # Writes questionCount onto custom_tests docs whose stored value drifted. dateMillis is left
+    # alone: the mirror may have guessed it from the title, and only the backfill persists that
+    with _quiz_lock:
+        updates = {}
+        for doc_id, test in _quiz_tests.items():
+            live_count = len(_quiz_questions_by_test.get(test["id"], {}))
+            if test["questionCount"] != live_count:
+                updates[doc_id] = {"questionCount": live_count}
+    if not updates:
+        return 0
+
+    db = get_firestore()
+    batch = db.batch()
+    for i, (doc_id, fields) in enumerate(updates.items(), 1):
+        batch.update(db.collection("custom_tests").document(doc_id), fields)
+        if i % 400 == 0:
+            batch.commit()
+            batch = db.batch()
+    batch.commit()
+    print("[Quiz Stats Synced]", len(updates), "tests")
+    return len(updates)
+
+def backfill_quiz_test_stats():
+    db = get_firestore()
+    batch = db.batch()
+    updated = 0
+    for doc in db.collection("custom_tests").select(QUIZ_TEST_FIELDS).stream():
+        data = doc.to_dict() or {}
+        test = quiz_test_from_doc(doc.id, data)
+        fields = {"questionCount": count_quiz_questions(test["id"])}
+        if not data.get("dateMillis"):
+            fields["dateMillis"] = test["dateMillis"]
+        batch.update(doc.reference, fields)
+        updated += 1
+        print("[Quiz Backfill]", doc.id, fields)
+        if updated % 400 == 0:
+            batch.commit()
+            batch = db.batch()
+    batch.commit()
+    print("[Quiz Backfill] Updated", updated, "tests")
+
+def fetch_quiz_questions_from_firestore(test_id):
+    db = get_firestore()
+    docs = db.collection("custom_questions").where("testId", "==", test_id).stream()
+    return [quiz_question_from_doc(doc.id, doc.to_dict() or {}) for doc in docs]
+
+def quiz_payload_response(test_id):
+    body, etag = get_quiz_payload(test_id)
+    response = cached_json_response(body, etag, QUIZ_CACHE_MAX_AGE)
+    if response.status_code == 304:
+        _quiz_stat("notModified")
+    return response
+
+@app.route("/quiz/api/bootstrap", methods=["GET", "POST"])
+def quiz_bootstrap():
+    try:
+        tests_body, _ = get_quiz_payload(None)
+        parts = [b'{"tests":', tests_body]
+
+        test_id = request.args.get("testId")
+        if test_id:
+            questions_body, _ = get_quiz_payload(test_id)
+            parts += [b',"questions":', questions_body]
+
+        today = datetime.now().strftime("%Y-%m-%d")
+        try:
+            count = record_visit() if request.method == "POST" else get_visitor_count(today)
+            visitors = {"date": today, "count": count}
+        except Exception as e:
+            print("[Visitor Count Error]", e)
+            visitors = None
+        parts += [b',"visitors":', serialize_json(visitors)[0], b"}"]
+
+        response = compressed_response(b"".join(parts), "application/json")
+        response.cache_control.no_store = True
+        return response
+    except Exception as e:
+        print("[Quiz bootstrap error]", e)
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/quiz/api/tests")
 def quiz_tests():
     try:
-        db = get_firestore()
-        tests = []
-        for doc in db.collection("custom_tests").stream():
-            data = doc.to_dict()
-            doc_id = doc.id
-            title = data.get("title") or ""
-            
-            # AUTOMATICALLY EXTRACT DATE FROM TITLE OR ID (No dateMillis needed in Firestore)
-            parsed_millis = 0
-            combined_str = f"{doc_id} {title}"
-            match = re.search(r'(?:20\d{2})?[^\w]?([a-zA-Z]{3,9})\s+(\d{1,2})', combined_str)
-            if match:
-                try:
-                    month_str, day_str = match.groups()
-                    date_obj = datetime.strptime(f"2026 {month_str} {day_str}", "%Y %b %d")
-                    parsed_millis = int(date_obj.timestamp() * 1000)
-                except:
-                    pass
-
-            tests.append({
-                "id": data.get("id") or doc_id,
-                "topicId": data.get("topicId") or "",
-                "title": title,
-                "subtitle": data.get("subtitle") or "",
-                "durationMinutes": data.get("durationMinutes") or 0,
-                "difficulty": data.get("difficulty") or "",
-                "dateMillis": parsed_millis,
-                "questionCount": 0,
-            })
-            
-        question_counts = {}
-        for doc in db.collection("custom_questions").stream():
-            data = doc.to_dict()
-            test_id = data.get("testId")
-            if test_id:
-                question_counts[test_id] = question_counts.get(test_id, 0) + 1
-        for test in tests:
-            test["questionCount"] = question_counts.get(test["id"], 0)
-
-        # STRICT LOGICAL SORTING: Automatically sort latest dates on top
-        tests.sort(key=lambda t: t.get("dateMillis", 0), reverse=True)
-
-        return jsonify(tests)
+        return quiz_payload_response(None)
     except Exception as e:
         print("[Quiz Firestore tests error]", e)
         return jsonify({"error": str(e)}), 500
@@ -1563,38 +3335,178 @@ def quiz_tests():
 @app.route("/quiz/api/questions/<path:test_id>")
 def quiz_questions(test_id):
     try:
-        db = get_firestore()
-        questions = []
-        docs = db.collection("custom_questions").where("testId", "==", test_id).stream()
-        for doc in docs:
-            data = doc.to_dict()
-            questions.append({
-                "id": data.get("id") or doc.id,
-                "testId": data.get("testId") or "",
-                "topicId": data.get("topicId") or "",
-                "questionText": data.get("questionText") or "",
-                "option0": data.get("option0") or "",
-                "option1": data.get("option1") or "",
-                "option2": data.get("option2") or "",
-                "option3": data.get("option3") or "",
-                "correctOptionIndex": data.get("correctOptionIndex", 0),
-                "explanation": data.get("explanation") or "",
-                "hint": data.get("hint") or "",
-            })
-        return jsonify(questions)
+        return quiz_payload_response(test_id)
     except Exception as e:
         print("[Quiz Firestore questions error]", e)
         return jsonify({"error": str(e)}), 500
 
+# ============================================================
+# SCHEDULER
+# ============================================================
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+_jobs_wake = threading.Event()
+_job_pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+
+def add_job(name, func, interval, jitter=0, first_delay=0, default_interval=600, pool=None):
+    with _jobs_lock:
+        _jobs[name] = {"func": func, "interval": interval, "jitter": jitter, "pool": pool or _job_pool,
+                       "currentInterval": default_interval if callable(interval) else interval,
+                       "nextRun": time.time() + first_delay, "running": False, "pending": False,
+                       "runs": 0, "errors": 0, "triggers": 0, "coalesced": 0,
+                       "lastStart": None, "lastDuration": None, "lastResult": None, "lastError": None}
+    _jobs_wake.set()
+
+def trigger_job(name, delay=0):
+    # Pulls a job's next run forward; a trigger that arrives mid-run queues exactly one rerun
+    with _jobs_lock:
+        job = _jobs.get(name)
+        if not job:
+            return
+        job["triggers"] += 1
+        if job["running"]:
+            job["pending"] = True
+            job["coalesced"] += 1
+        else:
+            job["nextRun"] = min(job["nextRun"], time.time() + delay)
+    _jobs_wake.set()
+
+def job_interval(name, job):
+    # Intervals may be callables so a job can adapt its own cadence
+    if not callable(job["interval"]):
+        return job["interval"]
+    try:
+        job["currentInterval"] = job["interval"]()
+    except Exception as e:
+        print("[Job Interval Error]", name, e)
+    return job["currentInterval"]
+
+def run_job(name, job):
+    start = time.time()
+    result = error = None
+    try:
+        result = job["func"]()
+    except Exception as e:
+        error = str(e)
+        print("[Job Error]", name, e)
+    interval = job_interval(name, job)
+    with _jobs_lock:
+        job["running"] = False
+        job["runs"] += 1
+        job["lastStart"] = start
+        job["lastDuration"] = round(time.time() - start, 3)
+        job["lastResult"] = result if isinstance(result, (int, float, str, type(None))) else str(result)
+        job["lastError"] = error
+        if error:
+            job["errors"] += 1
+        if job["pending"]:
+            job["pending"] = False
+            job["nextRun"] = time.time()
+        else:
+            # Jitter keeps jobs sharing an interval from drifting into lockstep bursts
+            job["nextRun"] = time.time() + interval + random.uniform(0, job["jitter"])
+    _jobs_wake.set()
+
+def scheduler_loop():
+    while True:
+        _jobs_wake.clear()
+        now = time.time()
+        wait = 60
+        with _jobs_lock:
+            for name, job in _jobs.items():
+                # A running job is never started twice; its next run is set when it finishes
+                if job["running"]:
+                    continue
+                if job["nextRun"] <= now:
+                    job["running"] = True
+                    job["pool"].submit(run_job, name, job)
+                else:
+                    wait = min(wait, job["nextRun"] - now)
+        _jobs_wake.wait(max(0.05, wait))
+
+def jobs_snapshot():
+    now = time.time()
+    with _jobs_lock:
+        return {name: {"interval": round(job["currentInterval"]), "running": job["running"], "pending": job["pending"],
+                       "dueInSeconds": round(max(0, job["nextRun"] - now), 1),
+                       "runs": job["runs"], "errors": job["errors"],
+                       "triggers": job["triggers"], "coalesced": job["coalesced"], "lastStart": job["lastStart"],
+                       "lastDuration": job["lastDuration"], "lastResult": job["lastResult"],
+                       "lastError": job["lastError"]}
+                for name, job in sorted(_jobs.items())}
+
+def register_feed_jobs():
+    # Scrapes run on the wide refresh pool so minutes-long audio builds on the job pool never hold them up
+    for name in TELEGRAM_CHANNELS:
+        add_job(f"telegram:{name}", lambda name=name: refresh_channel_once(name, force=True),
+                lambda name=name: channel_poll_interval(name), jitter=REFRESH_JITTER_SECONDS,
+                first_delay=random.uniform(0, REFRESH_JITTER_SECONDS), default_interval=TELEGRAM_REFRESH_SECONDS,
+                pool=_refresh_pool)
+        # Fallback interval only; new messages trigger the audio job directly
+        add_job(f"audio:{name}", lambda name=name: generate_audio_from_feed(name),
+                AUDIO_REFRESH_SECONDS, jitter=REFRESH_JITTER_SECONDS,
+                first_delay=TELEGRAM_REFRESH_SECONDS / 2)
+
+@app.route("/jobs")
+def jobs():
+    return jsonify(jobs_snapshot())
+
+# ============================================================
+# STATS
+# ============================================================
+
+@app.route("/stats")
+def stats():
+    with _quiz_lock:
+        quiz_stats = dict(quiz_catalog_stats)
+        quiz_stats["tests"] = len(_quiz_tests)
+        quiz_stats["questions"] = len(_quiz_questions)
+    quiz_stats["ready"] = _quiz_catalog_ready.is_set()
+    quiz_stats["listenersActive"] = _quiz_watches_active()
+    quiz_stats["ageSeconds"] = round(time.time() - _quiz_catalog_synced_at, 1) if _quiz_catalog_synced_at else None
+    with _visitor_lock:
+        visitor_stats = {"pending": dict(_visitor_pending), "inflight": dict(_visitor_inflight),
+                         "unconfirmed": dict(_visitor_written),
+                         "flushed": {date: count for date, (count, _) in _visitor_flushed.items()}}
+    return jsonify({"quizCatalog": quiz_stats, "visitors": visitor_stats, "http": http_stats_snapshot(),
+                    "refresh": dict(refresh_stats),
+                    "polling": dict(_poll_state),
+                    "audio": dict(audio_stats),
+                    "feedCache": dict(feed_cache_stats),
+                    "jobs": jobs_snapshot()})
+
 # ============================================================
 # RUN (Koyeb Port Configured)
 # ============================================================
 
 if __name__ == "__main__":
+    if sys.argv[1:] == ["backfill-quiz-stats"]:
+        backfill_quiz_test_stats()
+        sys.exit(0)
+    if sys.argv[1:2] == ["bench-parse"]:
+        bench_parse(sys.argv[2] if len(sys.argv) > 2 else BENCH_PAGE_FIXTURE,
+                    int(sys.argv[3]) if len(sys.argv) > 3 else 20)
+        sys.exit(0)
+    if sys.argv[1:2] == ["bench-tts"]:
+        bench_tts(int(sys.argv[2]) if len(sys.argv) > 2 else 25)
+        sys.exit(0)
+    if sys.argv[1:2] == ["backfill-telegram"]:
+        channel = sys.argv[2]
+        pages = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+        backfill_telegram_channel(channel, TELEGRAM_CHANNELS[channel], pages=pages)
+        sys.exit(0)
+
     print("[Startup] CA Blockbuster server starting...")
+    import_legacy_archives()
     print("[Startup] Firestore configured:", bool(os.environ.get("FIREBASE_SERVICE_ACCOUNT_JSON")))
-    threading.Thread(target=telegram_updater, daemon=True).start()
-    threading.Thread(target=audio_updater, daemon=True).start()
+    register_feed_jobs()
+    threading.Thread(target=scheduler_loop, daemon=True).start()
+    if os.environ.get("FIREBASE_SERVICE_ACCOUNT_JSON"):
+        threading.Thread(target=quiz_catalog_updater, daemon=True).start()
+        threading.Thread(target=visitor_flusher, daemon=True).start()
+        atexit.register(flush_visitor_counts)
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     
     port = int(os.environ.get("PORT", 8000))
     app.run(host="0.0.0.0", port=port)